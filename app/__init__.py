@@ -1,7 +1,10 @@
+from typing import Dict, List, Tuple
+
 from app.agents.emem import respond as emem_respond
 from app.agents.tolu import respond as tolu_respond
 from app.agents.sola import respond as sola_respond
 from app.agents.kemi import respond as kemi_respond
+from app.agents.batch import run_batch_async
 
 
 AGENT_REGISTRY = {
@@ -10,3 +13,21 @@ AGENT_REGISTRY = {
     "Sola": sola_respond,
     "Kemi": kemi_respond,
 }
+
+
+async def batch_respond(messages: List[Tuple[str, str]], context: dict | None = None) -> list:
+    """Answer many (agent_name, message) pairs concurrently; results keep input order."""
+    return await run_batch_async(
+        AGENT_REGISTRY[agent](message, context) for agent, message in messages
+    )
+
+
+async def fanout(message: str, names: List[str], context: dict | None = None) -> Dict[str, object]:
+    """
+    Send one message to several agents at once.
+
+    Returns {agent_name: reply}; an agent that raised maps to its exception
+    so one failure doesn't drop the other replies.
+    """
+    results = await run_batch_async(AGENT_REGISTRY[name](message, context) for name in names)
+    return dict(zip(names, results))
@@ -1,4 +1,5 @@
 # Make agents a proper package
 from . import tolu, emem, sola, kemi
+from .base import BaseAgent
 
-__all__ = ["tolu", "emem", "sola", "kemi"]
+__all__ = ["tolu", "emem", "sola", "kemi", "BaseAgent"]
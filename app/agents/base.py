@@ -1,24 +1,50 @@
+import asyncio
+from functools import lru_cache
 from pathlib import Path
-import google.generativeai as genai
 from typing import Optional
 
+from app.utils.gemini import CircuitOpenError, generate, get_model
+
+
+@lru_cache(maxsize=None)
+def _read_prompt(prompt_file: str) -> str:
+    """Read a prompt file once per process; agents sharing a prompt reuse it."""
+    path = Path(prompt_file)
+    if not path.exists():
+        raise FileNotFoundError(f"Prompt not found: {prompt_file}")
+    return path.read_text(encoding="utf-8")
+
 
 class BaseAgent:
-    def __init__(self, name: str, prompt_file: str, model_name: str = "gemini-1.5-pro"):
+    def __init__(
+        self,
+        name: str,
+        prompt_file: str,
+        model_name: str = "gemini-1.5-pro",
+        system_prompt: Optional[str] = None
+    ):
         self.name = name
-        self.system_prompt = self._load_prompt(prompt_file)
+        self.system_prompt = system_prompt if system_prompt is not None else self._load_prompt(prompt_file)
 
-        # Create a per-agent model instance (best-effort)
+        # Reuse the shared model for this prompt (best-effort); the prompt rides along
+        # as a system instruction rather than being prepended to every message
         try:
-            self.model = genai.GenerativeModel(model_name)
+            self.model = get_model(model_name, self.system_prompt)
         except (AttributeError, TypeError, RuntimeError, ImportError):
             self.model = None
 
+    @classmethod
+    async def create(cls, name: str, prompt_file: str, model_name: str = "gemini-1.5-pro") -> "BaseAgent":
+        """Build an agent from async code without blocking the event loop on the prompt read."""
+        system_prompt = await cls._load_prompt_async(prompt_file)
+        return cls(name, prompt_file, model_name, system_prompt=system_prompt)
+
     def _load_prompt(self, prompt_file: str) -> str:
-        path = Path(prompt_file)
-        if not path.exists():
-            raise FileNotFoundError(f"Prompt not found: {prompt_file}")
-        return path.read_text(encoding="utf-8")
+        return _read_prompt(str(prompt_file))
+
+    @staticmethod
+    async def _load_prompt_async(prompt_file: str) -> str:
+        return await asyncio.to_thread(_read_prompt, str(prompt_file))
 
     async def respond(self, user_message: str, _context: Optional[dict] = None) -> str:
         """Generate a short response using the agent's model.
@@ -30,8 +56,11 @@ class BaseAgent:
 
         # Prefer async generation API when available
         try:
-            response = await self.model.generate_content_async(user_message)
+            response = await generate(self.model, user_message)
             return response.text
+        except CircuitOpenError:
+            # Gemini is failing; don't retry it through the blocking sync client
+            raise
         except (AttributeError, RuntimeError):
             try:
                 resp = self.model.generate_content(user_message)
@@ -0,0 +1,43 @@
+"""
+Concurrent fan-out for agent calls.
+Runs many agent coroutines at once, bounded by a semaphore so bursts stay
+under Gemini's rate limits.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+DEFAULT_MAX_CONCURRENCY = 10
+
+ProgressCallback = Callable[[int, int], None]
+
+
+async def run_batch_async(
+    tasks: Iterable[Awaitable[Any]],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    on_progress: Optional[ProgressCallback] = None
+) -> List[Any]:
+    """
+    Await all `tasks` concurrently, at most `max_concurrency` at a time.
+
+    Results come back in input order. A failed task yields its exception in
+    place of a result so one bad call doesn't sink the whole batch.
+    `on_progress(done, total)` is called as each task finishes.
+    """
+    tasks = list(tasks)
+    total = len(tasks)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    done = 0
+
+    async def _run(task: Awaitable[Any]) -> Any:
+        nonlocal done
+        async with semaphore:
+            try:
+                return await task
+            finally:
+                done += 1
+                if on_progress:
+                    on_progress(done, total)
+
+    return await asyncio.gather(*(_run(t) for t in tasks), return_exceptions=True)
+
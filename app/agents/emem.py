@@ -1,41 +1,59 @@
 import google.generativeai as genai
 from pathlib import Path
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List
 from app.utils.deadline_formatter import format_deadline_display
+from app.utils.llm_cache import cached_generate, cached_generate_stream, generate_fresh
 
-# Load prompt from file
+# Load prompt from file once at import
 PROMPT_PATH = Path(__file__).parent.parent / "prompts" / "emem.txt"
+_SYSTEM_PROMPT = PROMPT_PATH.read_text(encoding="utf-8")
 
 
 def get_system_prompt() -> str:
-    """Load Emem's system prompt from file."""
-    with open(PROMPT_PATH, "r", encoding="utf-8") as f:
-        return f.read()
+    """Return Emem's system prompt."""
+    return _SYSTEM_PROMPT
 
-def respond(message: str, context: dict | None = None) -> str:
+async def respond(message: str, context: dict | None = None) -> str:
     """Simple response placeholder for Emem."""
     return "Emem response placeholder"
 
-def expectation_by_level(level: str) -> str:
-    if level == "Level 0":
-        return (
-            "This intern is still ramping up. Be explicit about what is required. "
-            "Do not assume prior experience. Set clear, achievable expectations."
-        )
-
-    if level == "Level 2":
-        return (
-            "This intern has demonstrated strong capability. "
-            "Expect ownership, initiative, and minimal hand-holding."
-        )
-
-    # Default: Level 1
-    return (
+_EXPECTATION_BY_LEVEL = {
+    "Level 0": (
+        "This intern is still ramping up. Be explicit about what is required. "
+        "Do not assume prior experience. Set clear, achievable expectations."
+    ),
+    "Level 1": (
         "This intern has some experience but may still need guidance. "
         "Set standard intern expectations and monitor progress."
+    ),
+    "Level 2": (
+        "This intern has demonstrated strong capability. "
+        "Expect ownership, initiative, and minimal hand-holding."
     )
+}
 
 
+def expectation_by_level(level: str) -> str:
+    # Default: Level 1
+    return _EXPECTATION_BY_LEVEL.get(level, _EXPECTATION_BY_LEVEL["Level 1"])
+
+
+_INTERRUPTION_PROMPTS = {
+    "scope_change": "The client just emailed asking to change the scope of the project.",
+    "constraint_added": "Legal just flagged a compliance issue. We need to add constraints.",
+    "urgent_pivot": "Drop everything. The client needs something else urgently.",
+    "data_correction": "The data we sent was wrong. The user needs to redo part of the work."
+}
+
+# Static head of the respond_to_message prompt; per-request sections follow it
+_RESPOND_INSTRUCTIONS = """
+Respond as Emem.
+- Be brief and directive
+- Set expectations appropriate to the intern's level
+- Reference their background only when it helps clarify expectations
+- Do NOT teach or explain how to do the task
+"""
+
 
 async def assign_task(
     task_title: str,
@@ -47,25 +65,43 @@ async def assign_task(
     """
     Generate Emem's task assignment message.
     """
-    system_prompt = get_system_prompt()
-
     prompt = f"""
-{system_prompt}
-
----
+Generate a short, sharp task assignment message.
+Be direct and set clear expectations.
 
 **TASK TO ASSIGN:**
 Title: {task_title}
 Brief: {task_brief}
 Deadline: {deadline}
 Client Constraints: {client_constraints or "None specified"}
-
-Generate a short, sharp task assignment message.
-Be direct and set clear expectations.
 """
 
-    response = await model.generate_content_async(prompt)
-    return response.text
+    return await cached_generate(model, prompt, system_instruction=_SYSTEM_PROMPT)
+
+
+def _respond_prompt(message: str, context: dict, chat_history: List[dict]) -> str:
+    user_level = context.get("user_level", "Level 1")
+    expectation_guidance = expectation_by_level(user_level)
+
+    # Recent chat (last 5 messages)
+    history_text = "\n".join(
+        f"{msg.get('role', 'user').upper()}: {msg.get('content', '')}" for msg in chat_history[-5:]
+    )
+
+    parts = [
+        _RESPOND_INSTRUCTIONS,
+        f"\n**INTERN PROFILE (FOR CONTEXT ONLY):**\nLevel: {user_level}\n",
+        # Intern background context (derived from CV by another agent)
+        f"Background Summary: {context.get('bio_summary') or 'No background summary available.'}\n",
+        f"\n**INTERN CONTEXT (DO NOT MENTION DIRECTLY):**\nIntern Level: {user_level}\n",
+        f"Expectation Guidance: {expectation_guidance}\n",
+        f"\n**WORK CONTEXT:**\nCurrent Task: {context.get('task_brief', 'No active task')}\n",
+        f"Deadline: {context.get('deadline', 'Not set')}\n",
+    ]
+    if history_text:
+        parts.append(f"\n**RECENT CHAT:**\n{history_text}\n")
+    parts.append(f"\n**USER MESSAGE:**\n{message}\n")
+    return "".join(parts)
 
 
 async def respond_to_message(
@@ -77,57 +113,19 @@ async def respond_to_message(
     """
     Respond to a deadline/task-related message as Emem.
     """
+    prompt = _respond_prompt(message, context, chat_history)
+    return await cached_generate(model, prompt, system_instruction=_SYSTEM_PROMPT)
 
-    # Intern background context (derived from CV by another agent)
-    bio_summary = context.get("bio_summary")
-    user_level = context.get("user_level", "Unknown")
-    user_level = context.get("user_level", "Level 1")
-    expectation_guidance = expectation_by_level(user_level)
-
-    system_prompt = get_system_prompt()
 
-    # Recent chat (last 5 messages)
-    history_text = ""
-    for msg in chat_history[-5:]:
-        role = msg.get("role", "user")
-        content = msg.get("content", "")
-        history_text += f"{role.upper()}: {content}\n"
-
-    current_task = context.get("task_brief", "No active task")
-    deadline = context.get("deadline", "Not set")
-
-    prompt = f"""
-{system_prompt}
-
----
-
-**INTERN PROFILE (FOR CONTEXT ONLY):**
-Level: {user_level}
-Background Summary: {bio_summary or "No background summary available."}
-
-**INTERN CONTEXT (DO NOT MENTION DIRECTLY):**
-Intern Level: {user_level}
-Expectation Guidance: {expectation_guidance}
-
-**WORK CONTEXT:**
-Current Task: {current_task}
-Deadline: {deadline}
-
-**RECENT CHAT:**
-{history_text}
-
-**USER MESSAGE:**
-{message}
-
-Respond as Emem.
-- Be brief and directive
-- Set expectations appropriate to the intern's level
-- Reference their background only when it helps clarify expectations
-- Do NOT teach or explain how to do the task
-"""
-
-    response = await model.generate_content_async(prompt)
-    return response.text
+def respond_to_message_stream(
+    message: str,
+    context: dict,
+    chat_history: List[dict],
+    model: genai.GenerativeModel
+) -> AsyncIterator[str]:
+    """Stream Emem's reply chunk by chunk (see `respond_to_message`)."""
+    prompt = _respond_prompt(message, context, chat_history)
+    return cached_generate_stream(model, prompt, system_instruction=_SYSTEM_PROMPT)
 
 
 async def generate_client_interruption(
@@ -144,31 +142,18 @@ async def generate_client_interruption(
     - 'urgent_pivot'
     - 'data_correction'
     """
-    system_prompt = get_system_prompt()
-
-    interruption_prompts = {
-        "scope_change": "The client just emailed asking to change the scope of the project.",
-        "constraint_added": "Legal just flagged a compliance issue. We need to add constraints.",
-        "urgent_pivot": "Drop everything. The client needs something else urgently.",
-        "data_correction": "The data we sent was wrong. The user needs to redo part of the work."
-    }
-
     prompt = f"""
-{system_prompt}
-
----
-
-**CURRENT TASK:** {current_task}
-
-**SITUATION:** {interruption_prompts.get(interruption_type, interruption_prompts['scope_change'])}
-
 Generate a realistic, urgent message from Emem about this change.
 Be specific about what needs to change.
 This should feel like real workplace chaos — frustrating but professional.
+
+**CURRENT TASK:** {current_task}
+
+**SITUATION:** {_INTERRUPTION_PROMPTS.get(interruption_type, _INTERRUPTION_PROMPTS['scope_change'])}
 """
 
-    response = await model.generate_content_async(prompt)
-    return response.text
+    # Not cached: interns on the same task should not all get the identical interruption
+    return await generate_fresh(model, prompt, system_instruction=_SYSTEM_PROMPT)
 
 async def generate_video_brief_script(
     task_title: str,
@@ -194,5 +179,5 @@ async def generate_video_brief_script(
         - Sounds like a voice note or video explanation
         """
 
-    response = await model.generate_content_async(prompt)
-    return response.text.strip()
+    text = await cached_generate(model, prompt)
+    return text.strip()
@@ -1,19 +1,58 @@
 import google.generativeai as genai
 from pathlib import Path
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List
+from app.utils.llm_cache import cached_generate, cached_generate_stream, generate_fresh
 import json
 
-# Load prompt from file
+# Load prompt from file once at import
 PROMPT_PATH = Path(__file__).parent.parent / "prompts" / "kemi.txt"
+_SYSTEM_PROMPT = PROMPT_PATH.read_text(encoding="utf-8")
 
 
 def get_system_prompt() -> str:
-    """Load Kemi's system prompt from file."""
-    with open(PROMPT_PATH, "r", encoding="utf-8") as f:
-        return f.read()
+    """Return Kemi's system prompt."""
+    return _SYSTEM_PROMPT
 
 
-def respond(message: str, context: dict | None = None) -> str:
+# Structured output for CV bullets - Gemini returns strict JSON, no fences
+CV_BULLET_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "skill_tag": {"type": "string"},
+        "bullet_point": {"type": "string"}
+    },
+    "required": ["skill_tag", "bullet_point"]
+}
+
+CV_BULLET_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": CV_BULLET_SCHEMA,
+    "temperature": 0.3
+}
+
+
+# Define interview length
+TOTAL_QUESTIONS = 5
+
+# Interviewer behavior rules
+_INTERVIEWER_RULES = """
+You are acting as a real interviewer.
+
+Rules:
+- Ask ONE question at a time
+- Do NOT give feedback, praise, or coaching during the interview
+- If an answer is vague, ask a brief follow-up
+- Maintain a neutral, professional tone
+- Slight pressure is acceptable
+"""
+
+# Static part of each interview-question prompt
+_INTERVIEW_QUESTION_INSTRUCTIONS = """Ask the next interview question.
+If the previous answer was vague, ask a follow-up instead.
+"""
+
+
+async def respond(message: str, context: dict | None = None) -> str:
     """Simple response placeholder for Kemi."""
     return "Kemi response placeholder"
 
@@ -30,12 +69,15 @@ async def translate_to_cv_bullet(
     Returns:
         dict with skill_tag and bullet_point
     """
-    system_prompt = get_system_prompt()
-    
     prompt = f"""
-{system_prompt}
+Translate the completed task below into a professional CV bullet point that would impress recruiters.
+Use action verbs, quantify impact where possible, and highlight transferable skills.
 
----
+Respond with JSON:
+{{
+    "skill_tag": "Technical category (e.g., 'SQL', 'Data Analysis', 'SEO')",
+    "bullet_point": "The professional CV-ready bullet point"
+}}
 
 **TASK COMPLETED:**
 Title: {task_title}
@@ -43,29 +85,17 @@ Description: {task_description}
 
 **WHAT THE USER DID:**
 {user_accomplishment}
-
-Translate this into a professional CV bullet point that would impress recruiters.
-Use action verbs, quantify impact where possible, and highlight transferable skills.
-
-Respond with JSON:
-{{
-    "skill_tag": "Technical category (e.g., 'SQL', 'Data Analysis', 'SEO')",
-    "bullet_point": "The professional CV-ready bullet point"
-}}
 """
 
-    response = await model.generate_content_async(prompt)
+    response_text = await cached_generate(
+        model,
+        prompt,
+        system_instruction=_SYSTEM_PROMPT,
+        generation_config=CV_BULLET_GENERATION_CONFIG
+    )
     
     try:
-        text = response.text.strip()
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        
-        return json.loads(text.strip())
+        return json.loads(response_text)
     except json.JSONDecodeError:
         return {
             "skill_tag": "General",
@@ -73,48 +103,50 @@ Respond with JSON:
         }
 
 
-async def respond_to_message(
-    message: str,
-    context: dict,
-    chat_history: List[dict],
-    model: genai.GenerativeModel
-) -> str:
-    """
-    Respond to a user seeking help, encouragement, or career advice.
-    """
-    system_prompt = get_system_prompt()
-    
-    history_text = ""
-    for msg in chat_history[-5:]:
-        role = msg.get("role", "user")
-        content = msg.get("content", "")
-        history_text += f"{role.upper()}: {content}\n"
+def _respond_prompt(message: str, context: dict, chat_history: List[dict]) -> str:
+    history_text = "\n".join(
+        f"{msg.get('role', 'user').upper()}: {msg.get('content', '')}" for msg in chat_history[-5:]
+    )
     
-    user_level = context.get("user_level", "Unknown")
-    track = context.get("track", "Unknown")
-    
-    prompt = f"""
-{system_prompt}
-
----
+    return f"""
+Respond as Coach Kemi. Be warm, encouraging, and focus on their growth.
+If they're struggling, help them see the bigger picture.
+If they're celebrating, celebrate with them and remind them of their progress.
 
 **CONTEXT:**
-User Level: {user_level}
-Track: {track}
+User Level: {context.get("user_level", "Unknown")}
+Track: {context.get("track", "Unknown")}
 
 **RECENT CHAT:**
 {history_text}
 
 **USER MESSAGE:**
 {message}
-
-Respond as Coach Kemi. Be warm, encouraging, and focus on their growth.
-If they're struggling, help them see the bigger picture.
-If they're celebrating, celebrate with them and remind them of their progress.
 """
 
-    response = await model.generate_content_async(prompt)
-    return response.text
+
+async def respond_to_message(
+    message: str,
+    context: dict,
+    chat_history: List[dict],
+    model: genai.GenerativeModel
+) -> str:
+    """
+    Respond to a user seeking help, encouragement, or career advice.
+    """
+    prompt = _respond_prompt(message, context, chat_history)
+    return await cached_generate(model, prompt, system_instruction=_SYSTEM_PROMPT)
+
+
+def respond_to_message_stream(
+    message: str,
+    context: dict,
+    chat_history: List[dict],
+    model: genai.GenerativeModel
+) -> AsyncIterator[str]:
+    """Yield Kemi's reply in chunks as it is generated; otherwise like `respond_to_message`."""
+    prompt = _respond_prompt(message, context, chat_history)
+    return cached_generate_stream(model, prompt, system_instruction=_SYSTEM_PROMPT)
 
 
 async def provide_soft_skills_feedback(
@@ -124,22 +156,13 @@ async def provide_soft_skills_feedback(
     """
     Analyze user's communication style and provide soft skills coaching.
     """
-    system_prompt = get_system_prompt()
-    
-    interactions_text = ""
-    for interaction in recent_interactions[-10:]:
-        interactions_text += f"USER: {interaction.get('user_message', '')}\n"
-        interactions_text += f"RESPONSE: {interaction.get('agent_response', '')}\n\n"
+    interactions_text = "\n\n".join(
+        f"USER: {interaction.get('user_message', '')}\nRESPONSE: {interaction.get('agent_response', '')}"
+        for interaction in recent_interactions[-10:]
+    )
     
     prompt = f"""
-{system_prompt}
-
----
-
-**RECENT USER INTERACTIONS:**
-{interactions_text}
-
-Analyze the user's communication style. Look for:
+Analyze the user's communication style in the interactions below. Look for:
 - Tone (defensive, professional, casual)
 - Response to criticism
 - Clarity of communication
@@ -147,10 +170,12 @@ Analyze the user's communication style. Look for:
 
 Provide brief, constructive feedback (2-3 sentences) on one area they could improve.
 Frame it positively - acknowledge what they're doing well, then suggest improvement.
+
+**RECENT USER INTERACTIONS:**
+{interactions_text}
 """
 
-    response = await model.generate_content_async(prompt)
-    return response.text
+    return await cached_generate(model, prompt, system_instruction=_SYSTEM_PROMPT)
 
 
 async def conduct_mock_interview(
@@ -164,28 +189,9 @@ async def conduct_mock_interview(
     Kemi must stay in interviewer mode until the interview ends.
     """
 
-    system_prompt = get_system_prompt()
-
-    # Define interview length
-    TOTAL_QUESTIONS = 5
-
-    # Interviewer behavior rules
-    interviewer_rules = """
-You are acting as a real interviewer.
-
-Rules:
-- Ask ONE question at a time
-- Do NOT give feedback, praise, or coaching during the interview
-- If an answer is vague, ask a brief follow-up
-- Maintain a neutral, professional tone
-- Slight pressure is acceptable
-"""
-
     # Final feedback mode
     if question_number > TOTAL_QUESTIONS:
-        feedback_prompt = f"""
-{system_prompt}
-
+        feedback_prompt = """
 You are now out of interview mode.
 
 Based on the candidate’s answers, provide:
@@ -197,34 +203,26 @@ Based on the candidate’s answers, provide:
 Be honest. No encouragement fluff.
 """
 
-        response = await model.generate_content_async(feedback_prompt)
+        content = await generate_fresh(model, feedback_prompt, system_instruction=_SYSTEM_PROMPT)
         return {
             "stage": "feedback",
-            "content": response.text
+            "content": content
         }
 
     # Normal interview question
-    interview_prompt = f"""
-{system_prompt}
-
-{interviewer_rules}
-
-Interview Type: {interview_type}
-Question Number: {question_number} of {TOTAL_QUESTIONS}
-
-Previous Answer:
-\"\"\"
-{previous_answer or "N/A"}
-\"\"\"
-
-Ask the next interview question.
-If the previous answer was vague, ask a follow-up instead.
-"""
+    interview_prompt = "".join((
+        _INTERVIEWER_RULES,
+        _INTERVIEW_QUESTION_INSTRUCTIONS,
+        f"\nInterview Type: {interview_type}\n",
+        f"Question Number: {question_number} of {TOTAL_QUESTIONS}\n",
+        f'\nPrevious Answer:\n"""\n{previous_answer or "N/A"}\n"""\n',
+    ))
 
-    response = await model.generate_content_async(interview_prompt)
+    # Not cached: every candidate should get their own question, not the last one for this prompt
+    content = await generate_fresh(model, interview_prompt, system_instruction=_SYSTEM_PROMPT)
 
     return {
         "stage": "question",
         "question_number": question_number,
-        "content": response.text
+        "content": content
     }
@@ -1,14 +1,15 @@
 import google.generativeai as genai
 from pathlib import Path
 from typing import Optional
+from app.utils.llm_cache import cached_generate
 
-# Load prompt from file
+# Load prompt from file once at import
 PROMPT_PATH = Path(__file__).parent.parent / "prompts" / "recommender.txt"
+_SYSTEM_PROMPT = PROMPT_PATH.read_text(encoding="utf-8")
 
 
 def get_system_prompt() -> str:
-    with open(PROMPT_PATH, "r", encoding="utf-8") as f:
-        return f.read()
+    return _SYSTEM_PROMPT
 
 
 async def generate_letter(
@@ -21,8 +22,6 @@ async def generate_letter(
     """
     Generate a formal recommendation letter for an intern.
     """
-    system_prompt = get_system_prompt()
-
     duration_label = (
         "12-week internship"
         if internship_duration_weeks == 12
@@ -30,9 +29,7 @@ async def generate_letter(
     )
 
     prompt = f"""
-{system_prompt}
-
----
+Write the recommendation letter for the internship below.
 
 **INTERNSHIP DETAILS**
 Track: {track}
@@ -47,14 +44,12 @@ Duration: {duration_label}
 \"\"\"
 {performance_summary or "No additional performance summary was provided."}
 \"\"\"
-
-Write the recommendation letter now.
 """
 
-    response = await model.generate_content_async(prompt)
+    letter_text = await cached_generate(model, prompt, system_instruction=_SYSTEM_PROMPT)
 
     return {
-        "letter_text": response.text.strip(),
+        "letter_text": letter_text.strip(),
         "duration_weeks": internship_duration_weeks,
         "tone": "formal"
     }
@@ -1,30 +1,154 @@
 import google.generativeai as genai
 from pathlib import Path
-from typing import Optional, List
-from app.archives.index import ARCHIVE_LIBRARY
+from typing import AsyncIterator, Optional, List
+from app.archives.index import ARCHIVE_INDEX, ARCHIVE_LIBRARY
+from app.config import get_logger
+from app.utils.gemini import count_tokens
+from app.utils.llm_cache import cached_generate, cached_generate_stream, generate_fresh
 import json
+import re
+import sys
 
-# Load prompt from file
+log = get_logger()
+
+# Load prompt from file once at import
 PROMPT_PATH = Path(__file__).parent.parent / "prompts" / "sola.txt"
+_SYSTEM_PROMPT = PROMPT_PATH.read_text(encoding="utf-8")
 
 
 def get_system_prompt() -> str:
-    """Load Sola's system prompt from file."""
-    with open(PROMPT_PATH, "r", encoding="utf-8") as f:
-        return f.read()
+    """Return Sola's system prompt."""
+    return _SYSTEM_PROMPT
+
+
+# Structured output for reviews - Gemini returns strict JSON, no fences
+REVIEW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "feedback": {"type": "string"},
+        "passed": {"type": "boolean"},
+        "score": {"type": "integer"},
+        "improvement_points": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["feedback", "passed", "score", "improvement_points"]
+}
+
+REVIEW_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": REVIEW_SCHEMA
+}
+
+# Review plus Socratic Defense questions from a single call
+REVIEW_AND_INTERROGATE_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "object",
+        "properties": {
+            "review": REVIEW_SCHEMA,
+            "questions": {"type": "array", "items": {"type": "string"}}
+        },
+        "required": ["review", "questions"]
+    }
+}
+
+# Submission text sent for review: a cheap character cut, then a token budget
+SUBMISSION_PREVIEW_TOKENS = 1500
+# Typical text averages about this many characters per token; previews shorter than
+# SUBMISSION_PREVIEW_TOKENS times this are within budget without asking Gemini
+CHARS_PER_TOKEN = 4
+# Generous enough that token-dense submissions (code, non-Latin text) still reach
+# the token budget instead of being cut short by characters
+SUBMISSION_PREVIEW_CHARS = SUBMISSION_PREVIEW_TOKENS * CHARS_PER_TOKEN * 2
+
+
+# Static prompt scaffolding; each call only fills in the dynamic fields
+_REVIEW_CRITERIA = """
+**REVIEW INSTRUCTIONS:**
+1. Check if submission addresses the task requirements
+2. Check code quality (if applicable): variable names, structure, comments
+3. Check if client constraints were followed
+4. Check formatting and professionalism
+5. Apply the 60% Rejection Rule - only approve truly excellent work
+"""
+_REVIEW_REMINDER = """
+Remember: You reject 60% of first drafts. Be thorough but fair.
+"""
+_REVIEW_INSTRUCTIONS = _REVIEW_CRITERIA + """
+IMPORTANT: Respond ONLY with valid JSON on a single line (no markdown, no code blocks):
+{"feedback": "Your detailed feedback message", "passed": true, "score": 85, "improvement_points": ["Point 1", "Point 2"]}
+""" + _REVIEW_REMINDER
+_INTERROGATION_CRITERIA = """- Why did they choose this specific method/approach?
+- Why not an alternative approach?
+- Can they explain a specific line/section?
+
+These questions should reveal whether they truly understand their work or just copied it.
+Be professional but probing.
+"""
+_REVIEW_BODY_TMPL = '''
+**TASK TO REVIEW:**
+Title: {title}
+Brief: {brief}
+Client Constraints: {constraints}
+
+**USER'S SUBMISSION:**
+"""
+{submission}
+"""
+'''.format_map
+
+_RESPOND_TMPL = """
+Respond as Sola. Use the Socratic method - guide them with questions, don't give direct answers.
+If they're asking about code/technical issues, ask clarifying questions that lead them to the solution.
+
+**CONTEXT:**
+Current Task: {current_task}
 
-def respond(message: str, context: dict | None = None) -> str:
+**RECENT CHAT:**
+{history}
+
+**USER MESSAGE:**
+{message}
+""".format_map
+
+_INTERROGATE_TMPL = (
+    "\nGenerate 2-3 pointed questions about the user's technical choices in the submission below:\n"
+    + _INTERROGATION_CRITERIA
+    + "\n**USER'S SUBMISSION:**\n{submission}\n\n**THEIR STATED APPROACH:**\n{approach}\n"
+).format_map
+
+_REVIEW_AND_INTERROGATE_TMPL = (
+    _REVIEW_CRITERIA
+    + "\n**SOCRATIC DEFENSE:**\nAlso generate 2-3 pointed questions about the user's technical choices:\n"
+    + _INTERROGATION_CRITERIA
+    + "\nIMPORTANT: Respond ONLY with valid JSON (no markdown, no code blocks):\n"
+    + '{{"review": {{"feedback": "Your detailed feedback message", "passed": true, "score": 85, '
+    + '"improvement_points": ["Point 1", "Point 2"]}}, "questions": ["Question 1", "Question 2"]}}\n'
+    + _REVIEW_REMINDER
+    + '\n**TASK TO REVIEW:**\nTitle: {title}\nBrief: {brief}\nClient Constraints: {constraints}\n'
+    + '\n**USER\'S SUBMISSION:**\n"""\n{submission}\n"""\n'
+    + "\n**THEIR STATED APPROACH:**\n{approach}\n"
+).format_map
+
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_JSON_DECODER = json.JSONDecoder()
+
+
+async def respond(message: str, context: dict | None = None) -> str:
     """Simple response placeholder for Sola."""
     return "Sola response placeholder"
 
 def select_task_resources(task_brief: str, track: str) -> list:
     resources = []
 
-    task_lower = task_brief.lower()
+    tokens = set(map(sys.intern, _WORD_RE.findall(task_brief.lower())))
 
-    for item in ARCHIVE_LIBRARY.get(track, []):
-        if any(tag in task_lower for tag in item["tags"]):
+    for item, tags in ARCHIVE_INDEX.get(track, ()):
+        if not tags.isdisjoint(tokens):
             resources.append(item)
+            # Leave room for the general hint below
+            if len(resources) == 2:
+                break
 
     # Always add one general workflow hint
     resources += ARCHIVE_LIBRARY.get("general", [])[:1]
@@ -32,6 +156,55 @@ def select_task_resources(task_brief: str, track: str) -> list:
     return resources[:3]  # hard limit
 
 
+async def _submission_preview(submission_content: str, model: genai.GenerativeModel) -> str:
+    """Trim a submission to about SUBMISSION_PREVIEW_TOKENS so every review has a stable prompt size."""
+    preview = submission_content[:SUBMISSION_PREVIEW_CHARS]
+    typical_chars = SUBMISSION_PREVIEW_TOKENS * CHARS_PER_TOKEN
+    if len(preview) <= typical_chars:
+        return preview
+
+    try:
+        # One count, then cut in proportion to the overshoot
+        tokens = await count_tokens(model, preview)
+    except Exception as e:
+        log.warning("sola: token count failed: %s - using character cut", e)
+        return preview[:typical_chars]
+
+    if tokens > SUBMISSION_PREVIEW_TOKENS:
+        preview = preview[:len(preview) * SUBMISSION_PREVIEW_TOKENS // tokens]
+    return preview
+
+
+def _validated_review(result) -> Optional[dict]:
+    """Return `result` if it has the required review fields, else None."""
+    if isinstance(result, dict) and "feedback" in result and "passed" in result:
+        # Ensure score is present
+        if "score" not in result:
+            result["score"] = 50
+        return result
+    return None
+
+
+def _fallback_review(feedback: Optional[str]) -> dict:
+    """Generic failed review, carrying the AI's raw feedback when there is any."""
+    return {
+        "feedback": feedback if feedback else "Unable to generate review. Please resubmit with clearer content.",
+        "passed": False,
+        "score": 0,
+        "improvement_points": ["Please ensure submission is clear and complete", "Resubmit for review"]
+    }
+
+
+async def _generate_review(model: genai.GenerativeModel, body: str) -> str:
+    # Exact prompt matches only: a similar submission is not the same work and must be graded on its own
+    return await cached_generate(
+        model,
+        _REVIEW_INSTRUCTIONS + body,
+        system_instruction=_SYSTEM_PROMPT,
+        generation_config=REVIEW_GENERATION_CONFIG
+    )
+
+
 async def review_submission(
     task_title: str,
     task_brief: str,
@@ -48,86 +221,45 @@ async def review_submission(
     Returns:
         dict with feedback, passed (bool), score (0-100), improvement_points
     """
-    system_prompt = get_system_prompt()
-    
     # Truncate very long submissions to avoid token limits
-    submission_preview = submission_content[:3000] if len(submission_content) > 3000 else submission_content
+    submission_preview = await _submission_preview(submission_content, model)
     
-    prompt = f"""
-{system_prompt}
-
----
-
-**TASK TO REVIEW:**
-Title: {task_title}
-Brief: {task_brief}
-Client Constraints: {client_constraints or "None specified"}
-
-**USER'S SUBMISSION:**
-\"\"\"
-{submission_preview}
-\"\"\"
-
-**REVIEW INSTRUCTIONS:**
-1. Check if submission addresses the task requirements
-2. Check code quality (if applicable): variable names, structure, comments
-3. Check if client constraints were followed
-4. Check formatting and professionalism
-5. Apply the 60% Rejection Rule - only approve truly excellent work
-
-IMPORTANT: Respond ONLY with valid JSON on a single line (no markdown, no code blocks):
-{{"feedback": "Your detailed feedback message", "passed": true, "score": 85, "improvement_points": ["Point 1", "Point 2"]}}
-
-Remember: You reject 60% of first drafts. Be thorough but fair.
-"""
-
+    body = _REVIEW_BODY_TMPL({
+        "title": task_title,
+        "brief": task_brief,
+        "constraints": client_constraints or "None specified",
+        "submission": submission_preview
+    })
+
+    response_text = None
     try:
-        response = await model.generate_content_async(prompt)
-        text = response.text.strip()
-        
-        # Remove markdown code blocks if present
-        if text.startswith("```"):
-            # Find the closing ```
-            lines = text.split('\n')
-            if len(lines) > 1:
-                # Remove first line (opening ```)
-                text = '\n'.join(lines[1:])
-                # Remove last line if it's closing ```
-                if text.endswith("```"):
-                    text = text[:-3]
-        
-        # Try to find JSON in the text
-        import re
-        json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', text, re.DOTALL)
-        
-        if json_match:
-            json_str = json_match.group(0)
-            result = json.loads(json_str)
-            
-            # Validate required fields
-            if isinstance(result, dict) and "feedback" in result and "passed" in result:
-                # Ensure score is present
-                if "score" not in result:
-                    result["score"] = 50
-                return result
-        
-        # If no valid JSON found, try to parse the whole text
-        result = json.loads(text)
-        if isinstance(result, dict) and "feedback" in result and "passed" in result:
-            if "score" not in result:
-                result["score"] = 50
-            return result
+        response_text = await _generate_review(model, body)
+        text = response_text.strip()
+
+        # Decode the first JSON object in the text, ignoring anything around it
+        start = text.find("{")
+        if start >= 0:
+            result, _ = _JSON_DECODER.raw_decode(text, start)
+            review = _validated_review(result)
+            if review is not None:
+                return review
             
     except (json.JSONDecodeError, AttributeError, IndexError) as e:
-        pass
+        log.warning("sola: could not parse review: %s - returning fallback review", e)
     
-    # Fallback - return a generic response with the AI's feedback
-    return {
-        "feedback": response.text if response else "Unable to generate review. Please resubmit with clearer content.",
-        "passed": False,
-        "score": 0,
-        "improvement_points": ["Please ensure submission is clear and complete", "Resubmit for review"]
-    }
+    return _fallback_review(response_text)
+
+
+def _respond_prompt(message: str, context: dict, chat_history: List[dict]) -> str:
+    # Only the last five turns are ever embedded in the prompt
+    recent = chat_history[-5:]
+    history_text = "\n".join(f"{msg.get('role', 'user').upper()}: {msg.get('content', '')}" for msg in recent)
+    
+    return _RESPOND_TMPL({
+        "current_task": context.get("task_brief", "No active task"),
+        "history": history_text,
+        "message": message
+    })
 
 
 async def respond_to_message(
@@ -139,36 +271,19 @@ async def respond_to_message(
     """
     Respond to a technical question as Sola using the Socratic method.
     """
-    system_prompt = get_system_prompt()
-    
-    history_text = ""
-    for msg in chat_history[-5:]:
-        role = msg.get("role", "user")
-        content = msg.get("content", "")
-        history_text += f"{role.upper()}: {content}\n"
-    
-    current_task = context.get("task_brief", "No active task")
-    
-    prompt = f"""
-{system_prompt}
-
----
+    prompt = _respond_prompt(message, context, chat_history)
+    return await cached_generate(model, prompt, system_instruction=_SYSTEM_PROMPT)
 
-**CONTEXT:**
-Current Task: {current_task}
-
-**RECENT CHAT:**
-{history_text}
 
-**USER MESSAGE:**
-{message}
-
-Respond as Sola. Use the Socratic method - guide them with questions, don't give direct answers.
-If they're asking about code/technical issues, ask clarifying questions that lead them to the solution.
-"""
-
-    response = await model.generate_content_async(prompt)
-    return response.text
+def respond_to_message_stream(
+    message: str,
+    context: dict,
+    chat_history: List[dict],
+    model: genai.GenerativeModel
+) -> AsyncIterator[str]:
+    """Streaming variant of `respond_to_message` - yields Sola's answer as it is generated."""
+    prompt = _respond_prompt(message, context, chat_history)
+    return cached_generate_stream(model, prompt, system_instruction=_SYSTEM_PROMPT)
 
 
 async def interrogate_submission(
@@ -180,27 +295,54 @@ async def interrogate_submission(
     The "Socratic Defense" - interrogate why the user made specific choices.
     This catches copied/AI-generated work since users can't defend choices they didn't make.
     """
-    system_prompt = get_system_prompt()
-    
-    prompt = f"""
-{system_prompt}
+    prompt = _INTERROGATE_TMPL({"submission": submission_content, "approach": approach_used})
 
----
+    # Not cached: a resubmission should face fresh questions, not the ones it already saw
+    return await generate_fresh(model, prompt, system_instruction=_SYSTEM_PROMPT)
 
-**USER'S SUBMISSION:**
-{submission_content}
 
-**THEIR STATED APPROACH:**
-{approach_used}
+async def review_and_interrogate(
+    task_title: str,
+    task_brief: str,
+    submission_content: str,
+    approach_used: str,
+    client_constraints: Optional[str],
+    model: genai.GenerativeModel
+) -> dict:
+    """
+    Review a submission and run the Socratic Defense in one Gemini call.
 
-Generate 2-3 pointed questions about their technical choices:
-- Why did they choose this specific method/approach?
-- Why not an alternative approach?
-- Can they explain a specific line/section?
+    Use this when a submission goes through both stages; it saves a round-trip
+    versus review_submission + interrogate_submission.
 
-These questions should reveal whether they truly understand their work or just copied it.
-Be professional but probing.
-"""
+    Returns:
+        dict with review (same shape as review_submission) and questions (list of str)
+    """
+    prompt = _REVIEW_AND_INTERROGATE_TMPL({
+        "title": task_title,
+        "brief": task_brief,
+        "constraints": client_constraints or "None specified",
+        "submission": await _submission_preview(submission_content, model),
+        "approach": approach_used
+    })
+
+    try:
+        response_text = await cached_generate(
+            model,
+            prompt,
+            system_instruction=_SYSTEM_PROMPT,
+            generation_config=REVIEW_AND_INTERROGATE_GENERATION_CONFIG
+        )
+        text = response_text.strip()
+        start = text.find("{")
+        if start >= 0:
+            result, _ = _JSON_DECODER.raw_decode(text, start)
+            if isinstance(result, dict):
+                review = _validated_review(result.get("review"))
+                if review is not None:
+                    return {"review": review, "questions": list(result.get("questions") or [])}
+
+    except (json.JSONDecodeError, AttributeError, IndexError):
+        pass
 
-    response = await model.generate_content_async(prompt)
-    return response.text
+    return {"review": _fallback_review(None), "questions": []}
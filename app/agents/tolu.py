@@ -1,51 +1,28 @@
 import google.generativeai as genai
 from pathlib import Path
-from typing import List
+from typing import AsyncIterator, List
 import json
+from app.utils.llm_cache import cached_generate, cached_generate_stream
 
-# Load prompt from file
+# Load prompt from file once at import
 PROMPT_PATH = Path(__file__).parent.parent / "prompts" / "tolu.txt"
+_SYSTEM_PROMPT = PROMPT_PATH.read_text(encoding="utf-8")
 
 
 def get_system_prompt() -> str:
-    """Load Tolu's system prompt from file."""
-    with open(PROMPT_PATH, "r", encoding="utf-8") as f:
-        return f.read()
+    """Return Tolu's system prompt."""
+    return _SYSTEM_PROMPT
 
-def respond(message: str, context: dict | None = None):
-    return "Tolu response placeholder"
-
-
-async def assess_bio(
-    bio_text: str,
-    track: str,
-    model: genai.GenerativeModel
-) -> dict:
-    """
-    Analyze a user's bio/resume and assign their skill level.
 
-    Returns:
-        dict with response_text, assessed_level, reasoning, warmup_mode
-    """
-    system_prompt = get_system_prompt()
-
-    assessment_prompt = f"""
-{system_prompt}
-
----
+_JSON_DECODER = json.JSONDecoder()
 
+# Prompt scaffolding is built once; each call only fills in the dynamic fields
+_ASSESSMENT_TMPL = '''
 **TASK: INTERN BACKGROUND REVIEW**
 
 You are reviewing this intern’s submitted bio/resume as part of an intake process.
 You are experienced and realistic — not overly encouraging.
 
-Track: {track}
-
-Submitted bio/resume:
-\"\"\"
-{bio_text}
-\"\"\"
-
 Assess the intern based on:
 - Evidence of hands-on work (projects, tools, real tasks)
 - Clarity and specificity of experience
@@ -70,22 +47,57 @@ Format strictly as JSON:
   "assessed_level": "Level 0 | Level 1 | Level 2",
   "reasoning": "..."
 }}
+
+Track: {track}
+
+Submitted bio/resume:
+"""
+{bio_text}
 """
+'''.format_map
 
-    response = await model.generate_content_async(assessment_prompt)
+_RESPOND_TMPL = """
+Respond as Tolu.
+- Be professional
+- Be concise
+- No coaching unless explicitly asked
 
-    try:
-        text = response.text.strip()
+**CONTEXT:**
+User Level: {user_level}
+Track: {track}
 
-        # Strip markdown fences if present
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
+**RECENT CHAT:**
+{history}
 
-        result = json.loads(text.strip())
+**USER MESSAGE:**
+{message}
+""".format_map
+
+
+async def respond(message: str, context: dict | None = None):
+    return "Tolu response placeholder"
+
+
+async def assess_bio(
+    bio_text: str,
+    track: str,
+    model: genai.GenerativeModel
+) -> dict:
+    """
+    Analyze a user's bio/resume and assign their skill level.
+
+    Returns:
+        dict with response_text, assessed_level, reasoning, warmup_mode
+    """
+    assessment_prompt = _ASSESSMENT_TMPL({"track": track, "bio_text": bio_text})
+
+    # Exact prompt matches only; a similar bio can still warrant a different level
+    response_text = await cached_generate(model, assessment_prompt, system_instruction=_SYSTEM_PROMPT)
+
+    try:
+        # Strip markdown fences if present, then decode the first JSON object
+        text = response_text.strip().removeprefix("```json").removeprefix("```").removesuffix("```")
+        result, _ = _JSON_DECODER.raw_decode(text, max(text.find("{"), 0))
 
         # Warmup mode only for Level 0
         result["warmup_mode"] = result.get("assessed_level") == "Level 0"
@@ -95,13 +107,26 @@ Format strictly as JSON:
     except json.JSONDecodeError:
         # Safe fallback
         return {
-            "response_text": response.text,
+            "response_text": response_text,
             "assessed_level": "Level 1",
             "reasoning": "Unable to reliably parse assessment; defaulting to Level 1.",
             "warmup_mode": False
         }
 
 
+def _respond_prompt(message: str, context: dict, chat_history: List[dict]) -> str:
+    # Only the last five turns are ever embedded in the prompt
+    recent = chat_history[-5:]
+    history_text = "\n".join(f"{msg.get('role', 'user').upper()}: {msg.get('content', '')}" for msg in recent)
+
+    return _RESPOND_TMPL({
+        "user_level": context.get("user_level", "Unknown"),
+        "track": context.get("track", "Unknown"),
+        "history": history_text,
+        "message": message
+    })
+
+
 async def respond_to_message(
     message: str,
     context: dict,
@@ -111,34 +136,16 @@ async def respond_to_message(
     """
     Respond to an administrative or general message as Tolu.
     """
-    system_prompt = get_system_prompt()
+    prompt = _respond_prompt(message, context, chat_history)
+    return await cached_generate(model, prompt, system_instruction=_SYSTEM_PROMPT)
 
-    history_text = ""
-    for msg in chat_history[-5:]:
-        role = msg.get("role", "user")
-        content = msg.get("content", "")
-        history_text += f"{role.upper()}: {content}\n"
 
-    prompt = f"""
-{system_prompt}
-
----
-
-**CONTEXT:**
-User Level: {context.get('user_level', 'Unknown')}
-Track: {context.get('track', 'Unknown')}
-
-**RECENT CHAT:**
-{history_text}
-
-**USER MESSAGE:**
-{message}
-
-Respond as Tolu.
-- Be professional
-- Be concise
-- No coaching unless explicitly asked
-"""
-
-    response = await model.generate_content_async(prompt)
-    return response.text
+def respond_to_message_stream(
+    message: str,
+    context: dict,
+    chat_history: List[dict],
+    model: genai.GenerativeModel
+) -> AsyncIterator[str]:
+    """Same as `respond_to_message`, but yields Tolu's reply in chunks as Gemini generates it."""
+    prompt = _respond_prompt(message, context, chat_history)
+    return cached_generate_stream(model, prompt, system_instruction=_SYSTEM_PROMPT)
@@ -1,3 +1,5 @@
+import sys
+
 ARCHIVE_LIBRARY = {
     "frontend": [
         {
@@ -30,3 +32,14 @@ ARCHIVE_LIBRARY = {
         }
     ]
 }
+
+# Intern tags so set lookups against interned brief tokens compare by identity
+for _items in ARCHIVE_LIBRARY.values():
+    for _item in _items:
+        _item["tags"] = tuple(sys.intern(tag.lower()) for tag in _item["tags"])
+
+# Per-track (item, lowercased tag set) pairs, built once for word-level matching
+ARCHIVE_INDEX = {
+    track: tuple((item, frozenset(item["tags"])) for item in items)
+    for track, items in ARCHIVE_LIBRARY.items()
+}
@@ -3,6 +3,9 @@ AI Agents Compliance and Ethics Framework
 Ensures all agents adhere to local, international laws, and ethical standards
 """
 
+import re
+from types import MappingProxyType
+
 # ============================================
 # INTERNATIONAL LAWS & REGULATIONS
 # ============================================
@@ -324,34 +327,39 @@ ETHICAL_TRAP_SCENARIOS = [
 # SCORING ETHICS
 # ============================================
 
+ETHICAL_KEYWORDS = {
+    "refuse": 30,
+    "no": 25,
+    "cannot": 25,
+    "against": 20,
+    "illegal": 20,
+    "unethical": 20,
+    "consent": 15,
+    "written": 15,
+    "violation": 15,
+    "policy": 15,
+    "alternatives": 10,
+    "proper": 10
+}
+
+# One pass over the text finds every keyword occurrence; the zero-width
+# lookahead lets overlapping matches through (e.g. "no" inside "cannot")
+_ETHICAL_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(re.escape(k) for k in sorted(ETHICAL_KEYWORDS, key=len, reverse=True)) + "))"
+)
+
+
 def evaluate_ethical_response(user_action: str) -> dict:
     """
     Score user's response to an ethical trap.
     Returns: {passed: bool, score: 0-100, feedback: str}
     """
-    ethical_keywords = {
-        "refuse": 30,
-        "no": 25,
-        "cannot": 25,
-        "against": 20,
-        "illegal": 20,
-        "unethical": 20,
-        "consent": 15,
-        "written": 15,
-        "violation": 15,
-        "policy": 15,
-        "alternatives": 10,
-        "proper": 10
-    }
-    
     user_lower = user_action.lower()
-    score = 0
     passed = False
     
-    # Calculate score based on keywords
-    for keyword, points in ethical_keywords.items():
-        if keyword in user_lower:
-            score += points
+    # Calculate score based on keywords (each keyword counts once)
+    found = set(_ETHICAL_KEYWORD_RE.findall(user_lower))
+    score = sum(ETHICAL_KEYWORDS[keyword] for keyword in found)
     
     # Threshold for passing
     passed = score >= 50
@@ -402,3 +410,25 @@ def report_compliance_violation(severity: str, violation: str, user_id: str, age
         "agent": agent,
         "action": "ESCALATE TO SUPERVISOR" if severity == "high_severity" else "COACHING FROM KEMI"
     }
+
+
+# ============================================
+# FREEZE REFERENCE DATA
+# ============================================
+
+def _freeze(value):
+    """Recursively turn dicts into read-only mappings and lists into tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+# These tables are reference data; freezing them stops accidental mutation and
+# lets worker processes share the pages copy-on-write
+COMPLIANCE_FRAMEWORK = _freeze(COMPLIANCE_FRAMEWORK)
+AGENT_COMPLIANCE = _freeze(AGENT_COMPLIANCE)
+ETHICAL_TRAP_SCENARIOS = _freeze(ETHICAL_TRAP_SCENARIOS)
+COMPLIANCE_VIOLATIONS = _freeze(COMPLIANCE_VIOLATIONS)
+ETHICAL_KEYWORDS = _freeze(ETHICAL_KEYWORDS)
@@ -0,0 +1,57 @@
+"""
+Application settings.
+`.env` is read once per process and every module shares the same values.
+"""
+
+import logging
+import os
+from functools import lru_cache
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+from google import genai
+from google.genai import types
+
+
+@lru_cache(maxsize=None)
+def settings() -> SimpleNamespace:
+    """Load `.env` on first call and return the parsed settings."""
+    load_dotenv()
+    return SimpleNamespace(
+        gemini_api_key=os.getenv("GEMINI_API_KEY"),
+        gemini_transport=os.getenv("GEMINI_TRANSPORT", "grpc"),
+        gemini_max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "20")),
+        gemini_timeout=float(os.getenv("GEMINI_TIMEOUT", "30")),
+        # Draft the portfolio bullet alongside the review. Off by default: most first
+        # submissions fail, so the drafted bullet is usually thrown away
+        speculative_cv_bullet=os.getenv("SPECULATIVE_CV_BULLET", "false").lower() in ("1", "true", "yes"),
+        # Set to WARNING in production to drop startup/info records
+        log_level=os.getenv("LOG_LEVEL", "INFO").upper()
+    )
+
+
+@lru_cache(maxsize=None)
+def get_logger() -> logging.Logger:
+    """The "wdc" application logger; handlers are configured on first call only."""
+    logger = logging.getLogger("wdc")
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(settings().log_level)
+    logger.propagate = False
+    return logger
+
+
+@lru_cache(maxsize=None)
+def get_genai_client() -> genai.Client:
+    """
+    Process-wide google-genai client.
+    Every caller shares its connection pool, so TLS setup and auth happen once.
+    Async calls (`client.aio`) go over aiohttp, which the SDK picks up from
+    requirements.txt instead of its slower default httpx transport.
+    """
+    config = settings()
+    return genai.Client(
+        api_key=config.gemini_api_key,
+        http_options=types.HttpOptions(timeout=int(config.gemini_timeout * 1000))
+    )
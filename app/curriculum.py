@@ -3,10 +3,11 @@ WDC Labs Curriculum Definitions.
 Maps specific task numbers in a track to learning objectives and topics.
 """
 
-"""
-WDC Labs Curriculum Definitions.
-Maps specific task numbers in a track to learning objectives and topics.
-"""
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Optional, Tuple
 
 CURRICULUM = {
     # ================================
@@ -245,8 +246,84 @@ CURRICULUM = {
 }
 
 
-def get_curriculum_step(track: str, task_number: int):
-    """Retrieve the specific curriculum step for a given track and task number."""
-    track_key = track.lower().replace(" ", "_")
-    track_curriculum = CURRICULUM.get(track_key, {})
-    return track_curriculum.get(task_number)
+# Flyweight pool so equal concept lists across steps share one tuple object
+_TUPLE_POOL = {}
+
+
+def _freeze(value):
+    """Recursively turn dicts into read-only mappings, lists into pooled tuples and intern strings."""
+    if isinstance(value, dict):
+        return MappingProxyType({_freeze(k): _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        frozen = tuple(_freeze(v) for v in value)
+        return _TUPLE_POOL.setdefault(frozen, frozen)
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+@dataclass(slots=True, frozen=True)
+class CurriculumStep:
+    """One task in a track. Slotted, so each step is a fixed-size struct rather than a dict."""
+    topic: str
+    objective: str
+    complexity: str
+    key_concepts: Tuple[str, ...]
+
+
+# Reference data: freezing it stops accidental writes from dirtying
+# copy-on-write pages in forked workers
+CURRICULUM = MappingProxyType({
+    sys.intern(track_key): MappingProxyType({
+        task_number: CurriculumStep(**_freeze(step))
+        for task_number, step in track_steps.items()
+    })
+    for track_key, track_steps in CURRICULUM.items()
+})
+
+# (track_key, task_number) -> read-only step, so a lookup is one hash probe
+_FLAT_CURRICULUM = {
+    (track_key, task_number): step
+    for track_key, track_steps in CURRICULUM.items()
+    for task_number, step in track_steps.items()
+}
+
+def _build_index(keys_of) -> MappingProxyType:
+    """Invert _FLAT_CURRICULUM: normalized key -> tuple of (track_key, task_number)."""
+    index = {}
+    for location, step in _FLAT_CURRICULUM.items():
+        for key in keys_of(step):
+            index.setdefault(sys.intern(key.lower()), []).append(location)
+    return MappingProxyType({key: tuple(locations) for key, locations in index.items()})
+
+
+# Reverse lookups, so filtering by level or concept is a hash probe, not a scan
+_BY_COMPLEXITY = _build_index(lambda step: (step.complexity,))
+_BY_CONCEPT = _build_index(lambda step: step.key_concepts)
+
+# Spellings callers actually pass ("digital_marketing", "Digital Marketing", ...) -> track key
+_TRACK_ALIASES = {
+    alias: track_key
+    for track_key in CURRICULUM
+    for alias in (track_key, track_key.replace("_", " "), track_key.replace("_", " ").title())
+}
+
+
+@lru_cache(maxsize=128)
+def get_curriculum_step(track: str, task_number: int) -> Optional[CurriculumStep]:
+    """
+    Retrieve the specific curriculum step for a given track and task number.
+    Memoized per (track, task_number); steps are read-only so sharing them is safe.
+    """
+    track_key = _TRACK_ALIASES.get(track) or track.lower().replace(" ", "_")
+    return _FLAT_CURRICULUM.get((track_key, task_number))
+
+
+def get_by_complexity(level: str) -> Tuple[Tuple[str, int], ...]:
+    """(track_key, task_number) of every step at `level` (e.g. "Beginner"), case-insensitive."""
+    return _BY_COMPLEXITY.get(" ".join(level.lower().split()), ())
+
+
+def get_by_concept(keyword: str) -> Tuple[Tuple[str, int], ...]:
+    """(track_key, task_number) of every step whose key concepts include `keyword`, case-insensitive."""
+    return _BY_CONCEPT.get(" ".join(keyword.lower().split()), ())
@@ -1,20 +1,29 @@
 # app/intent_classifier.py
-from dotenv import load_dotenv
-import json
-import os
-from typing import Dict
-from google import genai
+import asyncio
+import threading
+from types import MappingProxyType
+from typing import List, Optional
 
-load_dotenv()
+import orjson
+from cachetools import LRUCache, cached
+from google.genai import types
 
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+from app.config import get_genai_client, get_logger
+from app.utils.micro_batch import MicroBatcher
 
-INTENTS = {
+client = get_genai_client()
+
+log = get_logger()
+
+INTENT_MODEL = "gemini-1.5-pro"
+FALLBACK_INTENT = "hr_onboarding"
+
+INTENTS = MappingProxyType({
     "hr_onboarding": "tolu",
     "project_manager": "emem",
     "supervisor": "sola",
     "career_strategist": "kemi",
-}
+})
 
 INTENT_SYSTEM_PROMPT = """
 You are an intent classification engine for a virtual AI office.
@@ -38,28 +47,141 @@ JSON format:
 }
 """
 
+BATCH_INTENT_SYSTEM_PROMPT = INTENT_SYSTEM_PROMPT + """
+Batch mode:
+- The user content is a JSON array of messages
+- Return ONLY a JSON array with one object in the format above per message, in the same order
+"""
+
+# Constrained decoding: replies are always parseable and the intent is always valid
+INTENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "intent": {"type": "string", "enum": sorted(INTENTS)},
+        "confidence": {"type": "number"},
+        "reason": {"type": "string"}
+    },
+    "required": ["intent", "confidence", "reason"]
+}
+
+# Built once: the system prompt travels as system_instruction, so each call
+# only sends the user message(s)
+_GENERATION_CONFIG = types.GenerateContentConfig(
+    system_instruction=INTENT_SYSTEM_PROMPT,
+    temperature=0.0,
+    response_mime_type="application/json",
+    response_schema=INTENT_SCHEMA,
+)
+_BATCH_GENERATION_CONFIG = types.GenerateContentConfig(
+    system_instruction=BATCH_INTENT_SYSTEM_PROMPT,
+    temperature=0.0,
+    response_mime_type="application/json",
+    response_schema={"type": "array", "items": INTENT_SCHEMA},
+)
+
+INTENT_CACHE_SIZE = 4096
+# Messages arriving within this window share one Gemini call
+INTENT_BATCH_WINDOW = 0.02
+
+# Quick-action phrases that never need a model call
+COMMON_INTENTS = MappingProxyType({
+    "hi": "hr_onboarding",
+    "hello": "hr_onboarding",
+    "help": "hr_onboarding",
+    "submit": "supervisor",
+    "next task": "project_manager",
+})
+
+# normalized message -> intent; shared by the sync and batched paths, which
+# run on different threads. Keys are the plain normalized string on both paths
+_intent_cache = LRUCache(maxsize=INTENT_CACHE_SIZE)
+_intent_cache_lock = threading.Lock()
+
+
+def _normalize(message: str) -> str:
+    return " ".join(message.lower().split())
+
+
+def _known_intent(normalized: str) -> Optional[str]:
+    intent = COMMON_INTENTS.get(normalized)
+    if intent is None:
+        with _intent_cache_lock:
+            intent = _intent_cache.get(normalized)
+    return intent
+
 
 def classify_intent(message: str) -> str:
-    # pylint: disable=unexpected-keyword-arg
+    """
+    Classify `message` into one of INTENTS.
+
+    Classification is deterministic (temperature 0, fixed system prompt), so
+    results are memoized on the lowercased, whitespace-collapsed message.
+    """
+    normalized = _normalize(message)
+    intent = COMMON_INTENTS.get(normalized)
+    if intent is not None:
+        return intent
+    try:
+        return _classify_intent_uncached(normalized)
+    except Exception as e:
+        # Not cached, so the message is retried on its next occurrence
+        log.warning("intent: classification failed: %s - falling back to %s", e, FALLBACK_INTENT)
+        return FALLBACK_INTENT
+
+
+async def classify_intent_async(message: str) -> str:
+    """
+    Async `classify_intent` that never blocks the event loop.
+
+    Cache misses are queued on a micro-batcher, so concurrent requests
+    arriving within INTENT_BATCH_WINDOW are classified in one Gemini call.
+    """
+    normalized = _normalize(message)
+    intent = _known_intent(normalized)
+    if intent is not None:
+        return intent
+    return await _intent_batcher.submit(normalized)
+
+
+@cached(_intent_cache, key=lambda message: message, lock=_intent_cache_lock)
+def _classify_intent_uncached(message: str) -> str:
     response = client.models.generate_content(
-        model="gemini-1.5-pro",
-        contents=[
-            {"role": "system", "parts": [INTENT_SYSTEM_PROMPT]},
-            {"role": "user", "parts": [message]},
-        ],
-        generation_config={"temperature": 0.0},
-)
+        model=INTENT_MODEL,
+        contents=message,
+        config=_GENERATION_CONFIG,
+    )
+    return orjson.loads(response.text)["intent"]
+
 
+async def _classify_batch(messages: List[str]) -> List[str]:
+    """MicroBatcher handler: one Gemini call for every distinct message in the window."""
+    unique = list(dict.fromkeys(messages))
 
-    raw = response.text.strip()
+    if len(unique) == 1:
+        intent = await asyncio.to_thread(classify_intent, unique[0])
+        return [intent] * len(messages)
 
     try:
-        data: Dict = json.loads(raw)
-        intent = data.get("intent")
-        if intent in INTENTS:
-            return intent
-    except json.JSONDecodeError:
-        pass
-
-    # HARD fallback
-    return "hr_onboarding"
+        response = await client.aio.models.generate_content(
+            model=INTENT_MODEL,
+            contents=orjson.dumps(unique).decode(),
+            config=_BATCH_GENERATION_CONFIG,
+        )
+        data = orjson.loads(response.text)
+        if len(data) != len(unique):
+            raise ValueError(f"expected {len(unique)} intents, got {len(data)}")
+        intents = {m: item["intent"] for m, item in zip(unique, data)}
+    except Exception as e:
+        log.warning("intent: batch of %d failed: %s - classifying individually", len(unique), e)
+        results = await asyncio.gather(
+            *(asyncio.to_thread(classify_intent, m) for m in unique)
+        )
+        intents = dict(zip(unique, results))
+        return [intents[m] for m in messages]
+
+    with _intent_cache_lock:
+        _intent_cache.update(intents)
+    return [intents[m] for m in messages]
+
+
+_intent_batcher = MicroBatcher(_classify_batch, window=INTENT_BATCH_WINDOW)
@@ -3,23 +3,27 @@ WDC Labs AI Backend
 FastAPI application for the immersive virtual office AI system.
 """
 
-import os
-import io
+import asyncio
+import gc
+from contextlib import asynccontextmanager
 import re
-import json
+import sys
+import orjson
 import mimetypes
-from typing import Optional
+import tempfile
+from datetime import datetime
+from typing import BinaryIO, Dict, Optional
 import PyPDF2
-from dotenv import load_dotenv
+from cachetools import TTLCache
 import httpx
 from docx import Document
-import requests
-import google.generativeai as genai
-from pydantic import BaseModel
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
 
+from app.agents import kemi
+from app.config import get_logger, settings
 from app.orchestrator import Orchestrator
 from app.schemas import (
     ChatRequest, ChatResponse,
@@ -28,33 +32,129 @@ from app.schemas import (
     PortfolioBulletRequest, PortfolioBulletResponse,
     OnboardingIntroRequest, OnboardingIntroResponse,
     OnboardingIntroMessage, AgentName,
-    ResourceGenerationRequest, ResourceGenerationResponse
+    ResourceGenerationRequest, ResourceGenerationResponse,
+    FrozenModel, TrackKeyMixin
 )
-from app.task_templates import generate_task
+from app.task_templates import generate_task, task_deadline
+from app.utils.deadline_formatter import format_deadline_display
 from app.utils.file_extractor import extract_text_from_file
+from app.utils.gemini import CircuitOpenError, configure as configure_gemini, get_model
+from app.utils.llm_cache import cached_generate
+from app.utils.link_verifier import close_http_client as close_link_client
 
 
-# Load environment variables
-load_dotenv()
+try:
+    # C-backed PDF text extraction, much faster than PyPDF2
+    import fitz
+    PYMUPDF_SUPPORT = True
+except ImportError:
+    PYMUPDF_SUPPORT = False
+
+if sys.platform != "win32":
+    # uvloop has no Windows build (requirements.txt skips it there)
+    try:
+        # libuv-based event loop for any loop created after import (uvicorn picks it up via --loop uvloop)
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
 
 # Configure Gemini
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_API_KEY = settings().gemini_api_key
 if not GEMINI_API_KEY:
     raise ValueError("GEMINI_API_KEY environment variable is required")
 
-genai.configure(api_key=GEMINI_API_KEY)
+configure_gemini(GEMINI_API_KEY)
 
 # Initialize model
-model = genai.GenerativeModel("gemini-2.5-flash")
+model = get_model("gemini-2.5-flash")
 
 # Initialize orchestrator
 orchestrator = Orchestrator(model)
 
+# Outermost {...} in a model reply that may carry prose around the JSON
+_JSON_BLOCK_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+# The intro script only varies by intern name and track
+ONBOARDING_CACHE_TTL = 24 * 3600
+
+# Static part of the generated intro; sent as system instruction so prompts only carry name and track
+ONBOARDING_SYSTEM_PROMPT = """
+You write the scripted team introduction a new intern sees on their first login.
+
+The team consists of:
+- Tolu (Onboarding Officer): Professional, efficient. Example: "Welcome to WDC Labs."
+- Emem (Project Manager): Strict, deadline-driven. Example: "I need your first task by 5 PM."
+- Sola (Tech Lead): Critical, perfectionist. Example: "I'll be reviewing your code."
+- Kemi (Career Coach): Supportive, encouraging. Example: "I'm here to help you grow."
+
+Create a sequence of 4-6 short messages introducing themselves.
+
+Return ONLY valid JSON in this format:
+{
+    "messages": [
+        { "agent": "Tolu", "message": "..." },
+        { "agent": "Emem", "message": "..." },
+        { "agent": "Sola", "message": "..." },
+        { "agent": "Kemi", "message": "..." }
+    ]
+}
+"""
+
+# One pooled client for file downloads; connections are reused across requests
+# and HTTP/2 hosts multiplex concurrent downloads over a single connection
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE = 20
+http_client = httpx.AsyncClient(
+    http2=True,
+    timeout=30.0,
+    follow_redirects=True,
+    limits=httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE
+    )
+)
+
+# ============ STARTUP ============ 
+
+log = get_logger()
+
+
+# The prewarm is a single best-effort call; it never retries or feeds the circuit breaker
+PREWARM_TIMEOUT = 5.0
+
+
+async def _prewarm_gemini():
+    """Open the Gemini channel before traffic arrives so the first request doesn't pay for it."""
+    try:
+        await asyncio.wait_for(model.generate_content_async("ping"), timeout=PREWARM_TIMEOUT)
+        log.info("gemini prewarmed")
+    except Exception as e:
+        log.warning("gemini prewarm failed: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log.info("startup model=%s agents=%s", model.model_name, "Tolu,Emem,Sola,Kemi")
+    # Runs in the background so a slow or unreachable Gemini never delays startup
+    prewarm = asyncio.create_task(_prewarm_gemini())
+    # Module-level tables (curriculum, templates, compliance data) are built by
+    # now and never freed; move them out of the collector's generations
+    gc.freeze()
+    yield
+    prewarm.cancel()
+    await http_client.aclose()
+    await close_link_client()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="WDC Labs AI Backend",
     description="Immersive Virtual Office AI System with Multi-Agent Architecture",
-    version="1.0.0"
+    version="1.0.0",
+    # Serialize response bodies with orjson instead of the stdlib encoder
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -86,15 +186,118 @@ async def chat(request: ChatRequest):
         return await orchestrator.route_message(
             message=request.message,
             context=request.context,
-            chat_history=request.chat_history or []
+            chat_history=request.chat_history or [],
+            user_id=request.user_id
         )
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
 
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    /chat as newline-delimited JSON: {"agent": ...} first, then {"delta": ...}
+    pieces of the reply as they are generated. A failure after the stream has
+    started is reported as a final {"error": ...} line.
+    """
+    async def events():
+        try:
+            async for event in orchestrator.route_message_stream(
+                message=request.message,
+                context=request.context,
+                chat_history=request.chat_history or [],
+                user_id=request.user_id
+            ):
+                yield orjson.dumps(event) + b"\n"
+        except Exception as e:
+            log.error("chat stream failed: %s", e)
+            yield orjson.dumps({"error": str(e)}) + b"\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 # ============ BIO ASSESSMENT ============
 
+# Only this much CV text is sent to Tolu
+CV_TEXT_LIMIT = 3000
+# A bio this long is enough to assess on its own, so the CV isn't fetched
+BIO_SUFFICIENT_LENGTH = 600
+# With a shorter bio to fall back on, the CV only gets this long to download and parse
+CV_FETCH_TIMEOUT = 5.0
+
+
+def _join_until_limit(texts) -> str:
+    """Join page texts, stopping once CV_TEXT_LIMIT characters are collected (page extraction is the slow part)."""
+    pages, size = [], 0
+    for text in texts:
+        pages.append(text)
+        size += len(text)
+        if size >= CV_TEXT_LIMIT:
+            break
+    return "".join(pages)
+
+
+# Downloads are read in chunks of this size; files past the spool size go to a temp file
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_SPOOL_SIZE = 2 * 1024 * 1024
+
+
+async def _download_to_file(url: str) -> Optional[BinaryIO]:
+    """Stream `url` into a spooled temp file (rewound), or None on a non-200 response."""
+    async with http_client.stream("GET", url) as res:
+        if res.status_code != 200:
+            return None
+        buf = tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_SIZE)
+        async for chunk in res.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+            buf.write(chunk)
+    buf.seek(0)
+    return buf
+
+
+async def _download_text(url: str, limit: int) -> str:
+    """First `limit` characters of a text download; the rest of the body is never fetched."""
+    async with http_client.stream("GET", url) as res:
+        if res.status_code != 200:
+            return ""
+        parts, size = [], 0
+        async for text in res.aiter_text():
+            parts.append(text)
+            size += len(text)
+            if size >= limit:
+                break
+    return "".join(parts)[:limit]
+
+
+def _extract_cv_text(cv_url: str, cv_file: BinaryIO) -> str:
+    """Text of a PDF or DOCX CV, joined once rather than concatenated piece by piece."""
+    if cv_url.lower().endswith(".pdf"):
+        if PYMUPDF_SUPPORT:
+            try:
+                with fitz.open(stream=cv_file.read(), filetype="pdf") as doc:
+                    return _join_until_limit(page.get_text("text") for page in doc)
+            except Exception as e:
+                log.warning("PyMuPDF could not read CV: %s - falling back to PyPDF2", e)
+            cv_file.seek(0)
+
+        reader = PyPDF2.PdfReader(cv_file)
+        return _join_until_limit(page.extract_text() or "" for page in reader.pages)
+
+    doc = Document(cv_file)
+    return "".join(p.text + "\n" for p in doc.paragraphs)
+
+
+async def _fetch_cv_text(cv_url: str) -> str:
+    if cv_url.lower().endswith((".pdf", ".docx")):
+        cv_file = await _download_to_file(cv_url)
+        if cv_file is None:
+            return ""
+        with cv_file:
+            # Parsing is CPU-bound pure Python; keep it off the event loop
+            return await asyncio.to_thread(_extract_cv_text, cv_url, cv_file)
+    return await _download_text(cv_url, 5000)
+
+
 @app.post("/assess-bio", response_model=BioAssessmentResponse)
 async def assess_bio(request: BioAssessmentRequest):
     try:
@@ -102,22 +305,15 @@ async def assess_bio(request: BioAssessmentRequest):
         cv_text = ""
         cv_url = request.cv_url or request.file_url
 
-        if cv_url:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                res = await client.get(cv_url, timeout=30.0)
-                if res.status_code == 200:
-                    if cv_url.lower().endswith(".pdf"):
-
-                        reader = PyPDF2.PdfReader(io.BytesIO(res.content))
-                        for page in reader.pages:
-                            cv_text += page.extract_text() or ""
-                    elif cv_url.lower().endswith(".docx"):
-                        
-                        doc = Document(io.BytesIO(res.content))
-                        for p in doc.paragraphs:
-                            cv_text += p.text + "\n"
-                    else:
-                        cv_text = res.text[:5000]
+        if cv_url and len(bio_text) < BIO_SUFFICIENT_LENGTH:
+            if bio_text:
+                # The CV only enriches the bio here, so don't let a slow host hold up the response
+                try:
+                    cv_text = await asyncio.wait_for(_fetch_cv_text(cv_url), timeout=CV_FETCH_TIMEOUT)
+                except asyncio.TimeoutError:
+                    log.warning("CV fetch exceeded %ss - assessing the bio alone", CV_FETCH_TIMEOUT)
+            else:
+                cv_text = await _fetch_cv_text(cv_url)
 
         if not bio_text and not cv_text:
             raise HTTPException(
@@ -127,7 +323,7 @@ async def assess_bio(request: BioAssessmentRequest):
 
         assessment_text = bio_text
         if cv_text:
-            assessment_text += f"\n\n[CV Content]\n{cv_text[:3000]}"
+            assessment_text += f"\n\n[CV Content]\n{cv_text[:CV_TEXT_LIMIT]}"
 
         result = await orchestrator.assess_bio(assessment_text, request.track)
 
@@ -147,7 +343,6 @@ async def assess_bio(request: BioAssessmentRequest):
 @app.post("/translate-to-cv", response_model=PortfolioBulletResponse)
 async def translate_to_cv(request: PortfolioBulletRequest):
     try:
-        from .agents import kemi
         result = await kemi.translate_to_cv_bullet(
             task_title=request.task_title,
             task_description=request.task_description,
@@ -165,54 +360,88 @@ async def translate_to_cv(request: PortfolioBulletRequest):
 
 # ============ ONBOARDING INTRO ============
 
+_ONBOARDING_TOLU = ("Tolu", "Welcome to WDC Labs, {user_name}. You're now part of the {track} team. Your onboarding is complete and your workspace is ready.")
+_ONBOARDING_KEMI = ("Kemi", "Hi {user_name}! I'm Kemi, your career coach. Every task you finish here becomes something you can show employers, and I'm here to help you grow.")
+
+# Scripted team introductions per track key; {user_name} and {track} are filled per request
+ONBOARDING_TEMPLATES = {
+    "digital_marketing": [
+        _ONBOARDING_TOLU,
+        ("Emem", "I'm Emem, your project manager. Your first campaign brief lands shortly. Deadlines here are real, so plan your week around them."),
+        ("Sola", "Sola, tech lead. I review every deliverable against the numbers. Vague claims without data won't pass."),
+        _ONBOARDING_KEMI,
+    ],
+    "data_analytics": [
+        _ONBOARDING_TOLU,
+        ("Emem", "I'm Emem, your project manager. Your first dataset and brief are on the way. I need clean deliverables, on time."),
+        ("Sola", "Sola, tech lead. I'll be reviewing your queries and your analysis. Show your working and check your data before you send it."),
+        _ONBOARDING_KEMI,
+    ],
+    "cybersecurity": [
+        _ONBOARDING_TOLU,
+        ("Emem", "I'm Emem, your project manager. Your first assessment brief is coming. Scope and deadlines are fixed, so read the brief carefully."),
+        ("Sola", "Sola, tech lead. I'll be reviewing your findings. Every vulnerability you report needs evidence and a fix."),
+        _ONBOARDING_KEMI,
+    ],
+}
+ONBOARDING_DEFAULT_TEMPLATE = [
+    _ONBOARDING_TOLU,
+    ("Emem", "I'm Emem, your project manager. Your first task is due by 5 PM on its deadline day, so keep an eye on your brief."),
+    ("Sola", "Sola, tech lead. I'll be reviewing your work, and I'm thorough."),
+    _ONBOARDING_KEMI,
+]
+
+
+def _intro_messages(script) -> list:
+    """Attach simulated typing delays to (agent, message) pairs."""
+    messages = []
+    delay = 0
+    for agent, text in script:
+        delay += max(1500, len(text) * 60)
+        messages.append(
+            OnboardingIntroMessage(
+                agent=AgentName(agent),
+                message=text,
+                typing_delay_ms=delay
+            )
+        )
+    return messages
+
+
+def _template_intro(request: OnboardingIntroRequest) -> OnboardingIntroResponse:
+    script = ONBOARDING_TEMPLATES.get(request.track_key, ONBOARDING_DEFAULT_TEMPLATE)
+    fields = {"user_name": request.user_name, "track": request.track}
+    return OnboardingIntroResponse(
+        messages=_intro_messages((agent, text.format_map(fields)) for agent, text in script)
+    )
+
+
 @app.post("/onboarding-intro", response_model=OnboardingIntroResponse)
 async def generate_onboarding_intro(request: OnboardingIntroRequest):
-    try:
-        prompt = f"""
-        Generate a scripted team introduction for a new intern named {request.user_name} joining the {request.track} track.
-        
-        The team consists of:
-        - Tolu (Onboarding Officer): Professional, efficient. Example: "Welcome to WDC Labs."
-        - Emem (Project Manager): Strict, deadline-driven. Example: "I need your first task by 5 PM."
-        - Sola (Tech Lead): Critical, perfectionist. Example: "I'll be reviewing your code."
-        - Kemi (Career Coach): Supportive, encouraging. Example: "I'm here to help you grow."
+    # The scripted intro needs no model call; Gemini only runs when asked for variety
+    if request.variant != "generated":
+        return _template_intro(request)
 
-        Create a sequence of 4-6 short messages introducing themselves.
-        
-        Return ONLY valid JSON in this format:
-        {{
-            "messages": [
-                {{ "agent": "Tolu", "message": "..." }},
-                {{ "agent": "Emem", "message": "..." }},
-                {{ "agent": "Sola", "message": "..." }},
-                {{ "agent": "Kemi", "message": "..." }}
-            ]
-        }}
-        """
-        response = model.generate_content(prompt)
-        match = re.search(r"\{.*\}", response.text, re.DOTALL)
+    try:
+        prompt = f"Generate a scripted team introduction for a new intern named {request.user_name} joining the {request.track} track."
+        response_text = await cached_generate(
+            model,
+            prompt,
+            system_instruction=ONBOARDING_SYSTEM_PROMPT,
+            ttl=ONBOARDING_CACHE_TTL
+        )
+        match = _JSON_BLOCK_RE.search(response_text)
 
         if not match:
             raise ValueError("Invalid AI response")
 
-        data = json.loads(match.group())
-        messages = []
-
-        delay = 0
-        for msg in data["messages"]:
-            delay += max(1500, len(msg["message"]) * 60)
-            messages.append(
-                OnboardingIntroMessage(
-                    agent=AgentName(msg["agent"]),
-                    message=msg["message"],
-                    typing_delay_ms=delay
-                )
-            )
-
-        return OnboardingIntroResponse(messages=messages)
+        data = orjson.loads(match.group())
+        return OnboardingIntroResponse(
+            messages=_intro_messages((msg["agent"], msg["message"]) for msg in data["messages"])
+        )
 
-    except (ValueError, KeyError, TypeError):
-        return OnboardingIntroResponse(messages=[])
+    except (ValueError, KeyError, TypeError, CircuitOpenError):
+        return _template_intro(request)
 
 # ============ WORK SUBMISSION REVIEW (FINAL + VALID) ============
 
@@ -224,12 +453,13 @@ async def review_submission(request: SubmissionReviewRequest):
         
         if request.file_url and request.file_url.startswith("http"):
             try:
-                res = requests.get(request.file_url, timeout=30)
+                res = await http_client.get(request.file_url)
                 if res.status_code == 200:
                     mime, _ = mimetypes.guess_type(request.file_url)
                     
-                    # Use universal file extractor
-                    extracted = extract_text_from_file(
+                    # Use universal file extractor (parsing is CPU-bound, keep it off the event loop)
+                    extracted = await asyncio.to_thread(
+                        extract_text_from_file,
                         file_url=request.file_url,
                         file_content_bytes=res.content,
                         mime_type=mime
@@ -266,7 +496,7 @@ async def review_submission(request: SubmissionReviewRequest):
 
 # ============ TASK GENERATION ============
 
-class TaskRequest(BaseModel):
+class TaskRequest(TrackKeyMixin, FrozenModel):
     user_id: str
     user_name: str
     track: str
@@ -277,21 +507,74 @@ class TaskRequest(BaseModel):
     model: str
     include_video_brief: bool
 
+# Generated tasks are shared across interns for a day; the name and deadline are filled in per request
+TASK_CACHE_TTL = 24 * 3600
+_TASK_CACHE = TTLCache(maxsize=4096, ttl=TASK_CACHE_TTL)
+# Stand-in name passed to generate_task so a cached task can be personalized afterwards
+_INTERN_NAME_PLACEHOLDER = "__INTERN_NAME__"
+# Cache key -> generation in flight, so concurrent identical requests share one Gemini call
+_TASK_INFLIGHT: Dict[tuple, asyncio.Task] = {}
+
+
+def _personalize(value, user_name: str):
+    """Copy of a cached task with the placeholder name replaced (the cached task itself is left untouched)."""
+    if isinstance(value, str):
+        return value.replace(_INTERN_NAME_PLACEHOLDER, user_name)
+    if isinstance(value, dict):
+        return {k: _personalize(v, user_name) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_personalize(v, user_name) for v in value]
+    return value
+
+
+def _finish_task_generation(key: tuple, job: asyncio.Task) -> None:
+    _TASK_INFLIGHT.pop(key, None)
+    if not job.cancelled() and job.exception() is None:
+        _TASK_CACHE[key] = job.result()
+
+
+def _shared_task_generation(key: tuple, req: "TaskRequest", difficulty: str) -> asyncio.Task:
+    """The in-flight generation for `key`, starting one if none is running."""
+    job = _TASK_INFLIGHT.get(key)
+    if job is None:
+        job = asyncio.create_task(generate_task(
+            # user_id=req.user_id,
+            track=req.track,
+            difficulty=difficulty,
+            task_number=req.task_number,
+            user_city=req.user_city,
+            user_name=_INTERN_NAME_PLACEHOLDER,
+            model=model, # Pass the AI model for content generation
+            include_ethical_trap=req.include_ethical_trap,
+            include_video_brief=req.include_video_brief
+        ))
+        _TASK_INFLIGHT[key] = job
+        job.add_done_callback(lambda done: _finish_task_generation(key, done))
+    return job
+
+
 @app.post("/generate-tasks")
 async def generate_tasks(req: TaskRequest):
     print("request body: ", req)
 
-    task = await generate_task(
-        # user_id=req.user_id,
-        track=req.track,
-        difficulty=req.experience_level.lower(),
-        task_number=req.task_number,
-        user_city=req.user_city,
-        user_name=req.user_name,
-        model=model, # Pass the AI model for content generation
-        include_ethical_trap=req.include_ethical_trap,
-        include_video_brief=req.include_video_brief
+    difficulty = req.experience_level.lower()
+    key = (
+        req.track_key, difficulty, req.task_number, req.user_city,
+        req.include_ethical_trap, req.include_video_brief
     )
+    cached_task = _TASK_CACHE.get(key)
+    if cached_task is None:
+        # Shielded so one caller disconnecting doesn't cancel the generation for the others
+        cached_task = await asyncio.shield(_shared_task_generation(key, req, difficulty))
+
+    task = _personalize(cached_task, req.user_name)
+
+    # Deadlines are relative to when the intern receives the task, not when it was generated
+    deadline, duration_days = task_deadline(datetime.now())
+    task["deadline"] = deadline.isoformat()
+    task["deadline_display"] = format_deadline_display(task["deadline"])
+    task["ai_persona_config"]["duration"] = f"{duration_days} day"
+
     return {"tasks": [task]}
 
 
@@ -349,17 +632,3 @@ async def generate_tasks(req: TaskRequest):
 #         )
 #     except Exception as e:
 #         raise HTTPException(status_code=500, detail=str(e))
-
-# ============ STARTUP ============ 
-
-@app.on_event("startup")
-async def startup_event():
-    print("🚀 WDC Labs AI Backend starting...")
-    print("✅ Gemini configured")
-    print("✅ Orchestrator ready")
-
-
-# ============ HEALTH CHECK ============ 
-@app.get("/health")
-def health():
-    return "ok"
@@ -2,23 +2,171 @@
 WDC Labs AI Orchestrator
 The Central Brain that routes messages to the appropriate agent.
 """
-from typing import Optional, List
+import asyncio
+import hashlib
+import orjson
+import re
+from types import MappingProxyType
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, List, Tuple
 import google.generativeai as genai
 
+from .config import get_logger, settings
 from .schemas import AgentName, ChatContext, ChatResponse
 from .agents import tolu, emem, sola, kemi, recommender
-from .utils.link_verifier import clean_broken_links
-
-
-class Orchestrator:
-    """
-    Central message router enforcing Golden Master routing rules.
-    """
-
-    def __init__(self, model: genai.GenerativeModel):
-        self.model = model
-
-        self.router_prompt = """You are an intelligent message categorizer for a virtual office training system.
+from .utils.link_verifier import clean_broken_links, remove_broken_links
+from .utils.llm_cache import ResponseCache, cached_generate, quantize
+from .utils.semantic_router import SemanticRouter
+
+log = get_logger()
+
+# Agents only ever render the most recent messages
+HISTORY_WINDOW = 5
+
+# Routing depends only on the message and its context, so decisions can be reused for a day
+ROUTING_CACHE_TTL = 24 * 3600
+
+# Unambiguous keywords per agent (matched against the lowercased message). A short
+# message that hits exactly one agent is routed without calling the LLM router.
+FAST_ROUTE_PATTERNS = {
+    AgentName.KEMI: re.compile(
+        r"\b(?:worried|scared|anxious|stressed|struggl\w*|resume|cv|interview|portfolio|career|confidence)\b"
+    ),
+    AgentName.EMEM: re.compile(r"\b(?:deadlines?|brief|deliverables?|scope|client)\b"),
+    AgentName.SOLA: re.compile(r"\b(?:code|debug\w*|errors?|bugs?|syntax|python|javascript|sql)\b"),
+    AgentName.TOLU: re.compile(r"\b(?:salary|contract|polic(?:y|ies)|certificates?|onboarding|leave)\b"),
+}
+# Longer messages tend to mix topics; leave those to the LLM router
+FAST_ROUTE_MAX_WORDS = 25
+
+# Broader keyword buckets for the heuristic scorer (substring hits in the lowercased message)
+ROUTING_KEYWORDS = {
+    # Emotional/Career support
+    AgentName.KEMI: frozenset([
+        "worried", "scared", "help", "struggle", "stuck", "confused", "lost", "anxious", "stressed",
+        "resume", "cv", "interview", "portfolio", "career", "confidence", "skill", "growth", "job"
+    ]),
+    # Task/Project
+    AgentName.EMEM: frozenset(["deadline", "brief", "task", "project", "client", "deliverable", "submit", "due", "when"]),
+    # Technical
+    AgentName.SOLA: frozenset(["code", "debug", "error", "bug", "function", "variable", "syntax", "python", "javascript", "fix"]),
+    # HR/Admin
+    AgentName.TOLU: frozenset(["salary", "contract", "policy", "certificate", "onboarding", "admin", "hours", "leave"]),
+}
+# A unique top keyword score of at least this much routes without the LLM router
+KEYWORD_ROUTE_MIN_SCORE = 2
+
+# keyword -> agent, and one pattern that finds every keyword hit in a single pass.
+# The lookahead lets hits overlap ("debug" and "bug"); no keyword is a prefix of
+# another, so one alternative per position is enough.
+_KEYWORD_AGENTS = {k: agent for agent, keywords in ROUTING_KEYWORDS.items() for k in keywords}
+_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, sorted(_KEYWORD_AGENTS, key=len, reverse=True))) + "))"
+)
+
+# Phrases that always go to the recommendation-letter agent
+RECOMMENDER_RE = re.compile(
+    "recommendation letter|reference letter|referee|12 weeks recommendation|24 weeks recommendation"
+)
+
+# Labelled example messages; their embedding centroids route messages the
+# keyword fast path can't, before falling back to the LLM router
+AGENT_EXAMPLES = {
+    AgentName.TOLU: [
+        "When will I get my certificate after the internship?",
+        "How many hours a week am I expected to work?",
+        "Can you explain the internship contract terms?",
+        "Is this program paid or unpaid?",
+        "How do I request time off next week?",
+        "What is the company policy on remote work?",
+        "I just joined, what should I do first?",
+        "Who do I contact about an admin issue with my account?",
+        "Can you check the bio I submitted during signup?",
+        "How long does the whole program last?",
+    ],
+    AgentName.EMEM: [
+        "When is this task due?",
+        "Can I get an extension on the current assignment?",
+        "What exactly does the client want in this deliverable?",
+        "Is the dashboard part of the scope or optional?",
+        "The requirements changed, what should I prioritise now?",
+        "How should I plan my week to finish the project?",
+        "What format should the final report be in?",
+        "Can you clarify the brief for task two?",
+        "What is the next task after this one?",
+        "Who is the stakeholder for this project?",
+    ],
+    AgentName.SOLA: [
+        "My script throws a KeyError when I run it",
+        "How do I join two tables in SQL?",
+        "Why is my pandas merge producing duplicate rows?",
+        "Can you review my function and tell me what's wrong?",
+        "I get a null pointer exception in my loop",
+        "What's the best way to handle missing values in this dataset?",
+        "My chart isn't rendering in the notebook",
+        "How do I fix this import error?",
+        "Is my approach to the API pagination correct?",
+        "Can you explain what this stack trace means?",
+    ],
+    AgentName.KEMI: [
+        "I feel like I'm not good enough for this field",
+        "How do I describe this project on my CV?",
+        "I have a job interview next week, can you help me prepare?",
+        "I'm overwhelmed and thinking about quitting",
+        "What roles should I apply for after the internship?",
+        "How can I build confidence presenting my work?",
+        "Can you help me improve my LinkedIn summary?",
+        "I keep comparing myself to other interns",
+        "What skills should I focus on to grow my career?",
+        "I'm nervous about asking questions in meetings",
+    ],
+}
+
+# Agents the fused route-and-respond call may pick
+CHAT_AGENTS = {
+    AgentName.TOLU: tolu,
+    AgentName.EMEM: emem,
+    AgentName.SOLA: sola,
+    AgentName.KEMI: kemi,
+}
+
+# Start Kemi's CV bullet while Sola reviews instead of after a pass
+SPECULATIVE_CV_BULLET = settings().speculative_cv_bullet
+
+# Router reply (title-cased agent name) -> agent
+ROUTER_AGENTS = MappingProxyType({agent.value: agent for agent in CHAT_AGENTS})
+
+# A user's reply to the same opening message in the same task context is reused for a
+# while. Short messages also match near-duplicates by embedding. Follow-ups (non-empty
+# chat history) depend on the conversation and are never cached.
+REPLY_CACHE_TTL = 600
+REPLY_CACHE_SIZE = 1024
+REPLY_SIM_THRESHOLD = 0.95
+REPLY_SEMANTIC_MAX_WORDS = 12
+
+_reply_cache = ResponseCache(maxsize=REPLY_CACHE_SIZE)
+
+# Chat reply handlers, all called as (message, ctx, chat_history, model). The
+# recommender is dispatched separately since it needs the full ChatContext.
+_AGENT_DISPATCH: Dict[AgentName, Callable[..., Awaitable[str]]] = {
+    agent: module.respond_to_message for agent, module in CHAT_AGENTS.items()
+}
+
+FUSED_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "agent": {"type": "string", "enum": [agent.value for agent in CHAT_AGENTS]},
+        "message": {"type": "string"}
+    },
+    "required": ["agent", "message"]
+}
+
+FUSED_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": FUSED_RESPONSE_SCHEMA
+}
+
+# Static router rules; sent once as system instruction, so each routing call only carries the tail below
+ROUTER_PROMPT = """You are an intelligent message categorizer for a virtual office training system.
 
 Your job is to DETECT the category of the user's message and respond with ONLY the agent name.
 
@@ -68,15 +216,83 @@ or
 Sola
 or
 Kemi
+"""
+
+# The router answers with one agent name: decode greedily and stop at the first line.
+# No max_output_tokens cap - on 2.5 models thinking tokens count toward it, so a
+# tiny cap can leave the reply empty.
+ROUTER_GENERATION_CONFIG = {
+    "temperature": 0.0,
+    "top_p": 1.0,
+    "candidate_count": 1,
+    "stop_sequences": ["\n"]
+}
+
+# Per-request part of the router call
+_ROUTER_TMPL = """CONTEXT:
+User Level: {user_level}
+Track: {track}
+Active Task: {task_brief}
+
+USER MESSAGE:
+{message}
+
+Detect the appropriate agent category and respond with ONLY the agent name.
+""".format_map
+
+# Per-request part of the fused call; the router rules and personas travel as system instruction
+_FUSED_TMPL = """
+**CONTEXT:**
+User Level: {user_level}
+Track: {track}
+Active Task: {task_brief}
+Deadline: {deadline}
+Background Summary: {bio_summary}
+Expectation Guidance (for Emem, do not mention directly): {expectation_guidance}
+
+**RECENT CHAT:**
+{history}
+
+**USER MESSAGE:**
+{message}
+
+Pick the agent for this message, then reply as that agent.
+""".format_map
+
+
+class Orchestrator:
+    """
+    Central message router enforcing Golden Master routing rules.
+    """
+
+    def __init__(self, model: genai.GenerativeModel):
+        self.model = model
+        self.semantic_router = SemanticRouter(AGENT_EXAMPLES)
+
+        # Router categories and detection logic plus every chat persona, so one
+        # call can pick the agent and answer as it
+        router_rules = ROUTER_PROMPT[ROUTER_PROMPT.index("AGENT CATEGORIES:"):ROUTER_PROMPT.index("OUTPUT FORMAT:")]
+        persona_sections = "\n\n".join(
+            f"=== {agent.value.upper()} PERSONA ===\n{module.get_system_prompt()}"
+            for agent, module in CHAT_AGENTS.items()
+        )
+        self.fused_prompt = f"""You are the team of a virtual office training system.
+First DETECT which agent should handle the user's message, then reply to the user as that agent.
+
+{router_rules}
+{persona_sections}
+
+OUTPUT FORMAT:
+Return JSON with "agent" (Tolu, Emem, Sola or Kemi, chosen with the detection logic above)
+and "message" (the reply to the user, written fully in that agent's persona).
 """
 
     # ---------------------------
     # AGENT DETERMINATION
     # ---------------------------
 
-    async def determine_agent(self, message: str, context: ChatContext) -> AgentName:
-        msg = message.lower()
-
+    def _rule_route(self, msg: str, context: ChatContext) -> Optional[AgentName]:
+        """Routes that need no LLM: hard rules, then the keyword fast path. `msg` is lowercased."""
         # HARD RULES (NO AI NEEDED - CERTAINTY)
         if context.is_submission:
             return AgentName.SOLA
@@ -84,89 +300,113 @@ Kemi
         if context.is_first_login:
             return AgentName.TOLU
 
-        if any(k in msg for k in [
-            "recommendation letter",
-            "reference letter",
-            "referee",
-            "12 weeks recommendation",
-            "24 weeks recommendation"
-        ]):
+        if RECOMMENDER_RE.search(msg):
             return AgentName.RECOMMENDER
 
-        # AI-POWERED CATEGORY DETECTION
-        try:
-            # return AgentName.SOLA  # temporary
-            context_info = f"""
-User Level: {context.user_level or 'Unknown'}
-Track: {context.track or 'Unknown'}
-Active Task: {context.task_brief or 'None'}
-"""
+        # KEYWORD FAST PATH (only when exactly one agent matches)
+        return self._confident_keyword_route(msg)
 
-            prompt = f"""{self.router_prompt}
+    async def _route_without_llm(
+        self,
+        message: str,
+        context: ChatContext
+    ) -> Tuple[Optional[AgentName], Dict[AgentName, int], Optional[List[float]]]:
+        """
+        Rules, keyword scores, then the embedding router.
+
+        Returns (agent, keyword scores, message embedding). The agent is None
+        when only the LLM router can decide; the embedding is None when it
+        wasn't needed or the call failed. Callers reuse the scores and the
+        embedding for the rest of the request instead of recomputing them.
+        """
+        msg = message.lower()
+        scores = self._keyword_scores(msg)
 
-CONTEXT:
-{context_info}
+        agent = self._rule_route(msg, context)
+        if agent is None:
+            # KEYWORD SCORE ROUTE (clear winner only)
+            agent = self._keyword_route(scores)
+        if agent is not None:
+            return agent, scores, None
 
-USER MESSAGE:
-{message}
+        # EMBEDDING ROUTE (nearest example centroid, only when clearly ahead of the runner-up)
+        vector = await self.semantic_router.embed(" ".join(message.split()))
+        if vector is not None:
+            agent = await self.semantic_router.route_embedding(vector)
+        return agent, scores, vector
 
-Detect the appropriate agent category and respond with ONLY the agent name.
-"""
-
-            response = await self.model.generate_content_async(prompt)
-            agent_raw = response.text.strip().title()
+    async def determine_agent(self, message: str, context: ChatContext) -> AgentName:
+        agent, scores, _ = await self._route_without_llm(message, context)
+        if agent is not None:
+            return agent
+        return await self._llm_route(message, context, scores)
 
-            agent_map = {
-                "Tolu": AgentName.TOLU,
-                "Emem": AgentName.EMEM,
-                "Sola": AgentName.SOLA,
-                "Kemi": AgentName.KEMI,
-            }
+    async def _llm_route(self, message: str, context: ChatContext, scores: Dict[AgentName, int]) -> AgentName:
+        # AI-POWERED CATEGORY DETECTION
+        try:
+            # return AgentName.SOLA  # temporary
+            prompt = _ROUTER_TMPL({
+                "user_level": context.user_level or "Unknown",
+                "track": context.track or "Unknown",
+                "task_brief": context.task_brief or "None",
+                "message": message
+            })
+
+            response_text = await cached_generate(
+                self.model,
+                prompt,
+                system_instruction=ROUTER_PROMPT,
+                ttl=ROUTING_CACHE_TTL,
+                generation_config=ROUTER_GENERATION_CONFIG
+            )
+            agent_raw = response_text.strip().title()
 
-            detected_agent = agent_map.get(agent_raw, None)
+            detected_agent = ROUTER_AGENTS.get(agent_raw)
             
             # If AI detection failed, use fallback
             if detected_agent is None:
                 print(f"[ORCHESTRATOR] AI detection unclear: '{agent_raw}' - using fallback")
-                return self._fallback_routing(msg)
+                return self._fallback_routing(scores)
             
             return detected_agent
 
         except Exception as e:
             print(f"[ORCHESTRATOR] AI detection failed: {e} - using fallback")
-            return self._fallback_routing(msg)
-
-    def _fallback_routing(self, msg: str) -> AgentName:
+            return self._fallback_routing(scores)
+
+    def _confident_keyword_route(self, msg: str) -> Optional[AgentName]:
+        """Return the agent when a short message matches exactly one agent's keywords, else None."""
+        if len(msg.split()) > FAST_ROUTE_MAX_WORDS:
+            return None
+
+        matched = None
+        for agent, pattern in FAST_ROUTE_PATTERNS.items():
+            if pattern.search(msg):
+                if matched is not None:
+                    return None
+                matched = agent
+        return matched
+
+    @staticmethod
+    def _keyword_route(scores: Dict[AgentName, int]) -> Optional[AgentName]:
+        """The agent with a unique top score of at least KEYWORD_ROUTE_MIN_SCORE, else None."""
+        top, runner_up = sorted(scores.values(), reverse=True)[:2]
+        if top >= KEYWORD_ROUTE_MIN_SCORE and top > runner_up:
+            return max(scores, key=scores.get)
+        return None
+
+    @staticmethod
+    def _keyword_scores(msg: str) -> Dict[AgentName, int]:
+        """Distinct keyword hits per agent in the lowercased message."""
+        scores = dict.fromkeys(ROUTING_KEYWORDS, 0)
+        for keyword in set(_KEYWORD_RE.findall(msg)):
+            scores[_KEYWORD_AGENTS[keyword]] += 1
+        return scores
+
+    def _fallback_routing(self, scores: Dict[AgentName, int]) -> AgentName:
         """Fallback routing using heuristic rules (safe & reliable)"""
-        
-        # Emotional/Career support keywords
-        emotional_keywords = ["worried", "scared", "help", "struggle", "stuck", "confused", "lost", "scared", "anxious", "stressed"]
-        career_keywords = ["resume", "cv", "interview", "portfolio", "career", "confidence", "skill", "growth", "job"]
-        
-        # Task/Project keywords
-        task_keywords = ["deadline", "brief", "task", "project", "client", "deliverable", "submit", "due", "when"]
-        
-        # Technical keywords
-        tech_keywords = ["code", "debug", "error", "bug", "function", "variable", "syntax", "python", "javascript", "fix"]
-        
-        # HR/Admin keywords
-        hr_keywords = ["salary", "contract", "policy", "certificate", "certificate", "onboarding", "admin", "hours", "leave"]
-        
-        # Count keyword matches
-        emotional_count = sum(1 for k in emotional_keywords if k in msg)
-        career_count = sum(1 for k in career_keywords if k in msg)
-        task_count = sum(1 for k in task_keywords if k in msg)
-        tech_count = sum(1 for k in tech_keywords if k in msg)
-        hr_count = sum(1 for k in hr_keywords if k in msg)
-        
+
         # Route based on highest score
-        scores = {
-            AgentName.KEMI: emotional_count + career_count,
-            AgentName.EMEM: task_count,
-            AgentName.SOLA: tech_count,
-            AgentName.TOLU: hr_count
-        }
-        
         best_agent = max(scores, key=scores.get)
         
         # If no clear winner, default to Sola (technical)
@@ -175,21 +415,27 @@ Detect the appropriate agent category and respond with ONLY the agent name.
         
         return best_agent
 
+    @staticmethod
+    def _speculative_agent(scores: Dict[AgentName, int]) -> Optional[AgentName]:
+        """
+        Chat agent worth answering speculatively while the LLM router runs, or None.
+
+        Only called once no rule, keyword or embedding route applied; the
+        keyword scores must still point at a single agent, just too weakly
+        to route on.
+        """
+        top, runner_up = sorted(scores.values(), reverse=True)[:2]
+        if top == 0 or top == runner_up or top >= KEYWORD_ROUTE_MIN_SCORE:
+            return None
+        return max(scores, key=scores.get)
+
     # ---------------------------
     # MESSAGE ROUTING
     # ---------------------------
 
-    async def route_message(
-        self,
-        message: str,
-        context: ChatContext,
-        chat_history: Optional[List[dict]] = None
-    ) -> ChatResponse:
-
-        chat_history = chat_history or []
-        agent = await self.determine_agent(message, context)
-
-        ctx = {
+    @staticmethod
+    def _context_dict(context: ChatContext) -> dict:
+        return {
             "user_level": context.user_level,
             "track": context.track,
             "task_brief": context.task_brief,
@@ -199,37 +445,222 @@ Detect the appropriate agent category and respond with ONLY the agent name.
             "bio_summary": context.bio_summary,
         }
 
-        if agent == AgentName.TOLU:
-            text = await tolu.respond_to_message(message, ctx, chat_history, self.model)
+    async def _fused_reply(
+        self,
+        message: str,
+        context: ChatContext,
+        chat_history: tuple
+    ) -> Optional[Tuple[AgentName, str]]:
+        """
+        Pick the agent and write its reply in a single Gemini call.
+
+        Returns None if the fused reply can't be parsed, so the caller can fall
+        back to separate routing and response calls.
+        """
+        prompt = _FUSED_TMPL({
+            "user_level": context.user_level or "Unknown",
+            "track": context.track or "Unknown",
+            "task_brief": context.task_brief or "None",
+            "deadline": context.deadline or "Not set",
+            "bio_summary": context.bio_summary or "No background summary available.",
+            "expectation_guidance": emem.expectation_by_level(context.user_level),
+            "history": "\n".join(f"{msg.get('role', 'user').upper()}: {msg.get('content', '')}" for msg in chat_history),
+            "message": message
+        })
 
-        elif agent == AgentName.EMEM:
-            text = await emem.respond_to_message(message, ctx, chat_history, self.model)
+        try:
+            response_text = await cached_generate(
+                self.model,
+                prompt,
+                system_instruction=self.fused_prompt,
+                generation_config=FUSED_GENERATION_CONFIG
+            )
+            data = orjson.loads(response_text)
+            agent = AgentName(data["agent"])
+            text = data["message"]
+            if agent not in CHAT_AGENTS or not text:
+                raise ValueError(f"unusable fused reply for agent {agent}")
+        except Exception as e:
+            log.warning("orchestrator: fused route-and-respond failed: %s - using separate calls", e)
+            return None
 
-        elif agent == AgentName.SOLA:
-            text = await sola.respond_to_message(message, ctx, chat_history, self.model)
+        return agent, text
 
-        elif agent == AgentName.KEMI:
-            text = await kemi.respond_to_message(message, ctx, chat_history, self.model)
+    async def route_message(
+        self,
+        message: str,
+        context: ChatContext,
+        chat_history: Optional[List[dict]] = None,
+        user_id: Optional[str] = None
+    ) -> ChatResponse:
+        """
+        Route a chat message and return the chosen agent's reply.
+
+        Rules, keyword scores and the embedding router pick the agent without an
+        LLM call where they can. Otherwise a weak keyword guess answers
+        speculatively while the LLM router runs; with no guess at all, one fused
+        call picks the agent and writes the reply (separate calls if that fails).
+        """
+        # Slice once here; every agent then iterates a short immutable tuple
+        chat_history = tuple(chat_history[-HISTORY_WINDOW:]) if chat_history else ()
+        ctx = self._context_dict(context)
+
+        speculative = None
+        agent, scores, vector = await self._route_without_llm(message, context)
+        if agent is None:
+            guess = self._speculative_agent(scores)
+            if guess is None:
+                fused = await self._fused_reply(message, context, chat_history)
+                if fused is not None:
+                    agent, text = fused
+                    text = await clean_broken_links(text)
+                    return ChatResponse(agent=agent, message=text, metadata={"context": ctx})
+                agent = await self._llm_route(message, context, scores)
+            else:
+                # Start the likely agent's reply while routing runs; keep it only if routing agrees
+                speculative = asyncio.create_task(
+                    _AGENT_DISPATCH[guess](message, ctx, chat_history, self.model)
+                )
+                try:
+                    agent = await self._llm_route(message, context, scores)
+                except BaseException:
+                    speculative.cancel()
+                    raise
+                if agent != guess:
+                    speculative.cancel()
+                    speculative = None
+
+        text, cache_entry = await self._cached_reply(agent, message, context, chat_history, user_id, vector)
+        if text is not None:
+            if speculative is not None:
+                speculative.cancel()
+            return ChatResponse(agent=agent, message=text, metadata={"context": ctx})
+
+        handler = _AGENT_DISPATCH.get(agent)
+        if speculative is not None:
+            text = await speculative
+
+        elif handler is not None:
+            text = await handler(message, ctx, chat_history, self.model)
 
         elif agent == AgentName.RECOMMENDER:
-            result = await recommender.generate_letter(
-                cv_text=context.cv_text or "",
-                internship_duration_weeks=context.internship_duration_weeks or 12,
-                track=context.track or "Unknown",
-                performance_summary=context.performance_summary,
-                model=self.model
-            )
-            text = result.get("letter_text", "")
+            text = await self._recommendation_letter(context)
 
         else:
             text = "I'm not sure how to help with that."
 
         # Clean any broken links from the response
-        from app.utils.link_verifier import clean_broken_links_sync
-        text = clean_broken_links_sync(text)
+        text = await clean_broken_links(text)
+
+        self._store_reply(cache_entry, text)
 
         return ChatResponse(agent=agent, message=text, metadata={"context": ctx})
 
+    async def route_message_stream(
+        self,
+        message: str,
+        context: ChatContext,
+        chat_history: Optional[List[dict]] = None,
+        user_id: Optional[str] = None
+    ) -> AsyncIterator[dict]:
+        """
+        Streaming `route_message`.
+
+        Yields {"agent": ...} once routing is done, then {"delta": ...} pieces of
+        the reply. Chat agents stream from Gemini; broken links are removed one
+        line at a time as lines complete, since URLs never span lines. Replies
+        that aren't streamed (cache hits, letters) arrive as a single delta.
+        """
+        chat_history = tuple(chat_history[-HISTORY_WINDOW:]) if chat_history else ()
+        ctx = self._context_dict(context)
+
+        agent, scores, vector = await self._route_without_llm(message, context)
+        if agent is None:
+            agent = await self._llm_route(message, context, scores)
+        yield {"agent": agent.value}
+
+        text, cache_entry = await self._cached_reply(agent, message, context, chat_history, user_id, vector)
+        if text is not None:
+            yield {"delta": text}
+            return
+
+        module = CHAT_AGENTS.get(agent)
+        if module is None:
+            if agent == AgentName.RECOMMENDER:
+                text = await self._recommendation_letter(context)
+            else:
+                text = "I'm not sure how to help with that."
+            yield {"delta": await clean_broken_links(text)}
+            return
+
+        parts, pending = [], ""
+        async for chunk in module.respond_to_message_stream(message, ctx, chat_history, self.model):
+            pending += chunk
+            cut = pending.rfind("\n") + 1
+            if cut:
+                ready = await remove_broken_links(pending[:cut])
+                pending = pending[cut:]
+                parts.append(ready)
+                yield {"delta": ready}
+        if pending:
+            ready = await remove_broken_links(pending)
+            parts.append(ready)
+            yield {"delta": ready}
+
+        self._store_reply(cache_entry, "".join(parts).strip())
+
+    async def _recommendation_letter(self, context: ChatContext) -> str:
+        result = await recommender.generate_letter(
+            cv_text=context.cv_text or "",
+            internship_duration_weeks=context.internship_duration_weeks or 12,
+            track=context.track or "Unknown",
+            performance_summary=context.performance_summary,
+            model=self.model
+        )
+        return result.get("letter_text", "")
+
+    async def _cached_reply(
+        self,
+        agent: AgentName,
+        message: str,
+        context: ChatContext,
+        chat_history: tuple,
+        user_id: Optional[str],
+        vector: Optional[List[float]] = None
+    ):
+        """
+        Cached reply for this message, or None, plus the entry to pass to
+        `_store_reply` (None when the reply must not be cached).
+
+        `vector` is the message embedding from routing, if one was computed;
+        otherwise short messages are embedded here, in the same space.
+        """
+        # Submissions and letters are commands, not questions; only plain chat replies are cached.
+        # Replies draw on the user's bio and the conversation, so entries are per user and
+        # follow-ups are skipped.
+        if agent not in _AGENT_DISPATCH or context.is_submission or chat_history or not user_id:
+            return None, None
+
+        namespace = f"{agent.value}|{user_id}|{context.user_level}|{context.track}|{context.task_id}"
+        normalized = " ".join(message.lower().split())
+        key = hashlib.sha256(f"{namespace}\x00{normalized}".encode("utf-8")).hexdigest()
+
+        quantized = None
+        text = _reply_cache.get(key)
+        if text is None and len(normalized.split()) <= REPLY_SEMANTIC_MAX_WORDS:
+            if vector is None:
+                vector = await self.semantic_router.embed(" ".join(message.split()))
+            if vector is not None:
+                quantized = quantize(vector)
+                text = _reply_cache.get_similar(namespace, quantized, REPLY_SIM_THRESHOLD)
+        return text, (key, namespace, quantized)
+
+    @staticmethod
+    def _store_reply(cache_entry, text: str) -> None:
+        if cache_entry is not None:
+            key, namespace, vector = cache_entry
+            _reply_cache.set(key, text, REPLY_CACHE_TTL, namespace=namespace, vector=vector)
+
     # ---------------------------
     # DIRECT ROUTES
     # ---------------------------
@@ -245,21 +676,30 @@ Detect the appropriate agent category and respond with ONLY the agent name.
         client_constraints: Optional[str] = None
     ) -> dict:
 
-        review = await sola.review_submission(
-            task_title,
-            task_brief,
-            submission_content,
-            client_constraints,
-            self.model
-        )
+        def draft_bullet():
+            return kemi.translate_to_cv_bullet(task_title, task_brief, submission_content, self.model)
 
-        if review.get("passed"):
-            review["portfolio_bullet"] = await kemi.translate_to_cv_bullet(
+        # The CV bullet only depends on the submission, so draft it while Sola
+        # reviews and discard it if the submission doesn't pass
+        bullet_task = asyncio.create_task(draft_bullet()) if SPECULATIVE_CV_BULLET else None
+
+        try:
+            review = await sola.review_submission(
                 task_title,
                 task_brief,
                 submission_content,
+                client_constraints,
                 self.model
             )
+        except BaseException:
+            if bullet_task is not None:
+                bullet_task.cancel()
+            raise
+
+        if review.get("passed"):
+            review["portfolio_bullet"] = await (bullet_task if bullet_task is not None else draft_bullet())
+        elif bullet_task is not None:
+            bullet_task.cancel()
 
         return review
 
@@ -285,6 +725,23 @@ Detect the appropriate agent category and respond with ONLY the agent name.
             self.model
         )
 
+    async def review_and_interrogate(
+        self,
+        task_title: str,
+        task_brief: str,
+        submission_content: str,
+        approach_used: str,
+        client_constraints: Optional[str] = None
+    ) -> dict:
+        return await sola.review_and_interrogate(
+            task_title,
+            task_brief,
+            submission_content,
+            approach_used,
+            client_constraints,
+            self.model
+        )
+
     async def get_soft_skills_feedback(self, recent_interactions: List[dict]) -> str:
         return await kemi.provide_soft_skills_feedback(
             recent_interactions,
@@ -1,6 +1,29 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Literal, Dict, Any
 from enum import Enum
+from functools import cached_property
+
+
+def normalize_track(track: str) -> str:
+    """Canonical track key: "Digital Marketing" / "digital-marketing" -> "digital_marketing"."""
+    return "_".join(track.lower().replace("-", " ").split())
+
+
+class FrozenModel(BaseModel):
+    """
+    Base for every API schema. Instances are built once per request and only
+    read afterwards, so their fields can't be reassigned.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+
+class TrackKeyMixin:
+    """Adds `track_key`, computed once per request from the model's `track` field."""
+
+    @cached_property
+    def track_key(self) -> str:
+        return normalize_track(self.track)
 
 
 
@@ -22,7 +45,7 @@ class UserLevel(str, Enum):
 
 
 # Chat Request/Response
-class ChatContext(BaseModel):
+class ChatContext(FrozenModel):
     task_id: Optional[str] = None
     is_submission: bool = False
     is_first_login: bool = False
@@ -33,21 +56,21 @@ class ChatContext(BaseModel):
     cv_text: Optional[str] = None
     bio_summary: Optional[str] = None
 
-class ChatRequest(BaseModel):
+class ChatRequest(FrozenModel):
     user_id: str
     message: str
-    context: ChatContext = ChatContext()
-    chat_history: Optional[List[dict]] = []
+    context: ChatContext = Field(default_factory=ChatContext)
+    chat_history: Optional[List[dict]] = Field(default_factory=list)
 
 
-class ChatResponse(BaseModel):
+class ChatResponse(FrozenModel):
     agent: AgentName
     message: str
     metadata: Optional[dict] = None
 
 
 # Bio/Resume Assessment
-class BioAssessmentRequest(BaseModel):
+class BioAssessmentRequest(TrackKeyMixin, FrozenModel):
     user_id: str
     bio_text: Optional[str] = None
     file_url: Optional[str] = None
@@ -55,7 +78,7 @@ class BioAssessmentRequest(BaseModel):
     track: str
 
 
-class BioAssessmentResponse(BaseModel):
+class BioAssessmentResponse(FrozenModel):
     response_text: str
     assessed_level: UserLevel
     reasoning: str
@@ -63,7 +86,7 @@ class BioAssessmentResponse(BaseModel):
 
 
 # Task Generation
-class TaskGenerationRequest(BaseModel):
+class TaskGenerationRequest(TrackKeyMixin, FrozenModel):
     user_id: str
     track: str
     experience_level: str
@@ -73,13 +96,13 @@ class TaskGenerationRequest(BaseModel):
     user_country: Optional[str] = None
 
 
-class TaskResource(BaseModel):
+class TaskResource(FrozenModel):
     title: str
     description: str
     content: Optional[str] = None  # Markdown content, generated lazily or upfront
 
 
-class VideoBrief(BaseModel):
+class VideoBrief(FrozenModel):
     agent: str
     persona: str
     accent: str
@@ -89,38 +112,38 @@ class VideoBrief(BaseModel):
     status: str
 
 
-class GeneratedTask(BaseModel):
+class GeneratedTask(FrozenModel):
     title: str
     brief_content: str
     difficulty: str
     client_constraints: Optional[str] = None
     deadline: str
     deadline_display: str
-    attachments: Optional[List[str]] = []
+    attachments: Optional[List[str]] = Field(default_factory=list)
     ai_persona_config: Optional[dict] = None
     metadata: dict
-    educational_resources: Optional[List[TaskResource]] = []
+    educational_resources: Optional[List[TaskResource]] = Field(default_factory=list)
     video_brief: Optional[VideoBrief] = None
     has_ethical_trap: bool = False
     ethical_trap: Optional[dict] = None
 
 
-class TaskGenerationResponse(BaseModel):
+class TaskGenerationResponse(FrozenModel):
     tasks: List[GeneratedTask]
 
 
 # Work Submission Review
-class SubmissionReviewRequest(BaseModel):
+class SubmissionReviewRequest(FrozenModel):
     user_id: str
     task_id: str
     file_url: Optional[str] = None
     file_content: Optional[str] = None
     task_title: str
     task_brief: str
-    chat_history: Optional[List[dict]] = []
+    chat_history: Optional[List[dict]] = Field(default_factory=list)
 
 
-class SubmissionReviewResponse(BaseModel):
+class SubmissionReviewResponse(FrozenModel):
     agent: Literal["Sola"] = "Sola"
     feedback: str
     passed: bool
@@ -132,51 +155,52 @@ class SubmissionReviewResponse(BaseModel):
 
 
 # Portfolio Generation
-class PortfolioBulletRequest(BaseModel):
+class PortfolioBulletRequest(FrozenModel):
     task_title: str
     task_description: str
     user_submission: str
 
 
-class PortfolioBulletResponse(BaseModel):
+class PortfolioBulletResponse(FrozenModel):
     skill_tag: str
     bullet_point: str
 
 
 # Onboarding Team Introduction
-class OnboardingIntroRequest(BaseModel):
+class OnboardingIntroRequest(TrackKeyMixin, FrozenModel):
     user_id: str
     user_name: str
     track: str
     user_level: Optional[str] = None
     bio_summary: Optional[str] = None  # Brief summary of user's background
+    variant: Literal["template", "generated"] = "template"  # "generated" asks Gemini for a fresh script
 
 
-class OnboardingIntroMessage(BaseModel):
+class OnboardingIntroMessage(FrozenModel):
     agent: AgentName
     message: str
     typing_delay_ms: int  # Delay before showing this message (simulates typing)
 
 
-class OnboardingIntroResponse(BaseModel):
+class OnboardingIntroResponse(FrozenModel):
     messages: List[OnboardingIntroMessage]
 
 
 # Resource Generation
-class ResourceGenerationRequest(BaseModel):
+class ResourceGenerationRequest(TrackKeyMixin, FrozenModel):
     query: str
     track: str
     task_context: Optional[str] = None  # Title/Description of current task
     user_level: Optional[str] = None
 
 
-class ResourceGenerationResponse(BaseModel):
+class ResourceGenerationResponse(FrozenModel):
     title: str
     category: str
     content: str  # Markdown content
 
 
-class RecommendationLetterRequest(BaseModel):
+class RecommendationLetterRequest(TrackKeyMixin, FrozenModel):
     user_id: str
     cv_text: str
     track: str
@@ -184,13 +208,13 @@ class RecommendationLetterRequest(BaseModel):
     performance_summary: Optional[str] = None
 
 
-class RecommendationLetterResponse(BaseModel):
+class RecommendationLetterResponse(FrozenModel):
     letter_text: str
     tone: str
     duration_weeks: int
 
 
-class OrchestratorInput(BaseModel):
+class OrchestratorInput(FrozenModel):
     message: str
     current_task_id: Optional[str] = None
     uploaded_file: Optional[str] = None  # placeholder for now
@@ -199,8 +223,8 @@ class OrchestratorInput(BaseModel):
     user_track: Optional[str] = None
 
 
-class OrchestratorResponse(BaseModel):
+class OrchestratorResponse(FrozenModel):
     agent: str
     intent: str
     content: str
-    metadata: Dict[str, Any] = {}
+    metadata: Dict[str, Any] = Field(default_factory=dict)
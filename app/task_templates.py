@@ -4,13 +4,22 @@ Library of "Ungoogleable" task templates with messy data generation.
 Includes ethical training scenarios and compliance checks.
 """
 
+import orjson
 import random
-from typing import List, Dict, Any
+import re
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple
 from datetime import datetime, timedelta
+from app.curriculum import get_curriculum_step
+from app.schemas import normalize_track
 from app.utils.deadline_formatter import format_deadline_display
-from app.utils.link_verifier import clean_broken_links_sync
+from app.utils.link_verifier import clean_broken_links
+from app.utils.gemini import generate
 from .agents import emem
 
+# Outermost {...} in a model reply that may carry prose around the JSON
+_JSON_BLOCK_RE = re.compile(r"\{.*\}", re.DOTALL)
+
 # --- Industry contexts for task variation ---
 INDUSTRIES = [
     "Fintech", "Agriculture", "Logistics", "Healthcare", "E-commerce",
@@ -28,6 +37,9 @@ NIGERIAN_CITIES = [
     "Yobe", "Zamfara"
 ]
 
+# Module-level generator; saves the global-instance lookup behind each random.* call
+_rng = random.Random()
+
 # --- Company name generators ---
 COMPANY_PREFIXES = ["Tech", "Smart", "Prime", "Nova", "Apex", "Swift", "Core", "Global"]
 COMPANY_SUFFIXES = ["Hub", "Labs", "Solutions", "Systems", "Ventures", "Group", "Corp"]
@@ -35,56 +47,56 @@ COMPANY_SUFFIXES = ["Hub", "Labs", "Solutions", "Systems", "Ventures", "Group",
 def generate_company_name(industry: str) -> str:
     """Generate a random but realistic company name."""
     _ = industry
-    prefix = random.choice(COMPANY_PREFIXES)
-    suffix = random.choice(COMPANY_SUFFIXES)
-    city = random.choice(NIGERIAN_CITIES)
+    prefix = _rng.choice(COMPANY_PREFIXES)
+    suffix = _rng.choice(COMPANY_SUFFIXES)
+    city = _rng.choice(NIGERIAN_CITIES)
     return f"{city} {prefix} {suffix}"
 
 # --- Inject realistic anomalies for data tasks ---
+ANOMALY_TYPES = (
+    "currency_conversion_error",
+    "duplicate_row",
+    "null_value",
+    "date_format_error",
+    "decimal_shift"
+)
+
 def inject_data_anomalies(data: List[Dict], anomaly_count: int = 3) -> tuple:
     """
     Inject realistic data anomalies into a dataset.
     Returns (corrupted_data, anomaly_descriptions)
     """
-    anomaly_types = [
-        "currency_conversion_error",
-        "duplicate_row",
-        "null_value",
-        "date_format_error",
-        "decimal_shift"
-    ]
-    
     anomalies = []
-    for _ in range(anomaly_count):
-        row_idx = random.randint(0, len(data) - 1)
-        anomaly_type = random.choice(anomaly_types)
+    # Draw every anomaly type up front; row indices are drawn as we go since duplicates grow the data
+    for anomaly_type in _rng.choices(ANOMALY_TYPES, k=anomaly_count):
+        row_idx = _rng.randrange(len(data))
+        row = data[row_idx]
         
         if anomaly_type == "currency_conversion_error":
-            if "revenue" in data[row_idx]:
-                original = data[row_idx]["revenue"]
-                data[row_idx]["revenue"] = original * 1500  # NGN to USD error
+            if "revenue" in row:
+                row["revenue"] *= 1500  # NGN to USD error
                 anomalies.append(f"Row {row_idx + 1}: Currency conversion error in revenue")
         
         elif anomaly_type == "duplicate_row":
-            data.insert(row_idx + 1, data[row_idx].copy())
+            data.insert(row_idx + 1, row.copy())
             anomalies.append(f"Row {row_idx + 1}: Duplicate entry")
         
         elif anomaly_type == "null_value":
-            field = random.choice(list(data[row_idx].keys()))
-            data[row_idx][field] = None
+            field = _rng.choice(tuple(row))
+            row[field] = None
             anomalies.append(f"Row {row_idx + 1}: Missing value in {field}")
         
         elif anomaly_type == "date_format_error":
-            if "date" in data[row_idx]:
-                data[row_idx]["date"] = data[row_idx]["date"].replace("-", "/")
+            if "date" in row:
+                row["date"] = row["date"].replace("-", "/")
                 anomalies.append(f"Row {row_idx + 1}: Inconsistent date format")
         
         elif anomaly_type == "decimal_shift":
-            for key in data[row_idx]:
-                if isinstance(data[row_idx][key], (int, float)) and key != "id":
-                    data[row_idx][key] = data[row_idx][key] * 10
-                    anomalies.append(f"Row {row_idx + 1}: Decimal shift in {key}")
-                    break
+            # First numeric field other than the id
+            key = next((k for k, v in row.items() if isinstance(v, (int, float)) and k != "id"), None)
+            if key is not None:
+                row[key] *= 10
+                anomalies.append(f"Row {row_idx + 1}: Decimal shift in {key}")
     
     return data, anomalies
 
@@ -194,6 +206,17 @@ Provide recommendations with priority rankings.
     ]
 }
 
+def _index_templates_by_difficulty() -> Dict[tuple, tuple]:
+    index = {}
+    for track_key, templates in TASK_TEMPLATES.items():
+        for template in templates:
+            for level in template.get("difficulty_levels", ("intermediate",)):
+                index.setdefault((track_key, level), []).append(template)
+    return {key: tuple(found) for key, found in index.items()}
+
+# (track_key, difficulty) -> templates offered at that level
+_TEMPLATES_BY_TRACK_DIFF = _index_templates_by_difficulty()
+
 # --- Resource Content Library ---
 RESOURCE_CONTENT = {
     "da_guide_01": """
@@ -384,6 +407,30 @@ def select_task_resources(task_brief: str, track: str) -> list:
 
 
 # --- Main task generation function ---
+# Error causes for data tasks
+ERROR_CAUSES = (
+    "a currency conversion error",
+    "a data import bug",
+    "manual entry mistakes",
+    "a timezone misconfiguration"
+)
+
+
+@lru_cache(maxsize=1)
+def _month_year(minute: int) -> Tuple[str, int]:
+    """(month name, year) for a minute since the epoch; bursts of tasks share one strftime."""
+    moment = datetime.fromtimestamp(minute * 60)
+    return moment.strftime("%B"), moment.year
+
+
+def task_deadline(now: datetime):
+    """Deadline one day after `now`, skipping weekends; returns (deadline, duration_days)."""
+    deadline = now + timedelta(days=1)
+    while deadline.weekday() >= 5:  # Skip Saturday (5) and Sunday (6)
+        deadline += timedelta(days=1)
+    return deadline, (deadline - now).days
+
+
 async def generate_task(
     # user_id: int,
     user_name: str,
@@ -401,47 +448,36 @@ async def generate_task(
     """
     print("track was: ", track)
     # Normalize track name
-    track_key = track.lower().replace(" ", "_")
-    track_key = track_key.lower().replace("-", "_")
+    track_key = normalize_track(track)
     if track_key not in TASK_TEMPLATES:
         track_key = "data_analytics"
     
-    # Filter templates by difficulty
-    available_templates = [
-        t for t in TASK_TEMPLATES[track_key]
-        if difficulty.lower() in t.get("difficulty_levels", ["intermediate"])
-    ]
-    if not available_templates:
-        available_templates = TASK_TEMPLATES[track_key]
+    # Templates for this difficulty, or any template of the track
+    available_templates = (
+        _TEMPLATES_BY_TRACK_DIFF.get((track_key, difficulty.lower())) or TASK_TEMPLATES[track_key]
+    )
     
-    template = random.choice(available_templates)
+    template = _rng.choice(available_templates)
     
     # Determine if this task includes ethical trap (20-30% of tasks)
     if include_ethical_trap is None:
-        include_ethical_trap = random.random() < 0.25  # 25% chance
+        include_ethical_trap = _rng.random() < 0.25  # 25% chance
     
     # Generate random context
-    industry = random.choice(INDUSTRIES)
-    city = user_city or random.choice(NIGERIAN_CITIES)
+    industry = _rng.choice(INDUSTRIES)
+    city = user_city or _rng.choice(NIGERIAN_CITIES)
     company = generate_company_name(industry)
     
     # Date context
     now = datetime.now()
-    month = now.strftime("%B")
-    year = now.year
+    month, year = _month_year(int(now.timestamp()) // 60)
     
-    # Error causes for data tasks
-    error_causes = [
-        "a currency conversion error",
-        "a data import bug",
-        "manual entry mistakes",
-        "a timezone misconfiguration"
-    ]
+    # Curriculum briefs open with a greeting. It is added after generation so the
+    # name never passes through the model (which may reformat or drop it)
+    greeting = ""
 
-    
     # Format the template
     # CHECK FOR CURRICULUM OVERRIDE
-    from app.curriculum import get_curriculum_step
     curriculum = get_curriculum_step(track_key, task_number)
 
     if curriculum and model:
@@ -449,13 +485,13 @@ async def generate_task(
         company = generate_company_name(industry)
         
         prompt = f"""
-        Generate a concise task brief for an intern named "{user_name}" at a {industry} company named {company}.
+        Generate a concise task brief for an intern at a {industry} company named {company}.
         
         **Curriculum Logic:**
         - Task Number: {task_number}
-        - Topic: {curriculum['topic']}
-        - Learning Objective: {curriculum['objective']}
-        - Key Concepts to Test: {', '.join(curriculum['key_concepts'])}
+        - Topic: {curriculum.topic}
+        - Learning Objective: {curriculum.objective}
+        - Key Concepts to Test: {', '.join(curriculum.key_concepts)}
         
         **Context:**
         - City: {city}
@@ -463,7 +499,7 @@ async def generate_task(
         
         **Instructions:**
         Create a realistic workplace scenario (Task Title and Brief).
-        Address the intern directly by name ("Dear {user_name}").
+        Address the intern directly as "you", but do not add a greeting or salutation (one is added separately).
         The intern should feel like they are solving a real problem for the business.
         Include specific data points or file references (e.g., "attached sales_data.csv").
         Keep the brief concise, under 150 words.
@@ -477,48 +513,49 @@ async def generate_task(
         """
         
         try:
-            response = model.generate_content(prompt)
+            response = await generate(model, prompt)
             # Simple cleanup to find JSON
-            import json
-            import re
-            match = re.search(r"\{.*\}", response.text, re.DOTALL)
+            match = _JSON_BLOCK_RE.search(response.text)
             if match:
-                gen_data = json.loads(match.group())
+                gen_data = orjson.loads(match.group())
                 title = gen_data.get("title")
                 brief = gen_data.get("brief_template")
                 template["constraints"] = gen_data.get("constraints") # Override constrains
             else:
                 raise ValueError("Failed to parse AI curriculum task")
                  
-        except (ValueError, RuntimeError, json.JSONDecodeError) as e:
+        except (ValueError, RuntimeError, orjson.JSONDecodeError) as e:
             print(f"Curriculum generation failed: {e}. Falling back to curriculum-static mode.")
             # Fallback to Curriculum Static Mode (prevents random tasks)
-            title = f"{curriculum['topic']}: {company}"
+            title = f"{curriculum.topic}: {company}"
             brief = f"""
-**Topic:** {curriculum['topic']}
-**Objective:** {curriculum['objective']}
+**Topic:** {curriculum.topic}
+**Objective:** {curriculum.objective}
 
-Dear {user_name},
 At {company} in {city}, complete the objective above.
 
-**Key Concepts:** {', '.join(curriculum['key_concepts'])}
+**Key Concepts:** {', '.join(curriculum.key_concepts)}
 
 Use provided tools.
 """
             template["constraints"] = "Standard professional constraints apply."
 
+        greeting = f"Dear {user_name},\n\n"
+
     else:
         # STANDARD TEMPLATE LOGIC
-        title = template["title_template"].format(company=company, industry=industry, city=city)
-        brief = template["brief_template"].format(
-            company=company,
-            industry=industry,
-            city=city,
-            month=month,
-            year=year,
-            anomaly_count=random.randint(2, 5),
-            error_cause=random.choice(error_causes)
-        )
+        # One field map for both templates; format_map skips building a kwargs dict per call
+        fields = {
+            "company": company,
+            "industry": industry,
+            "city": city,
+            "month": month,
+            "year": year,
+            "anomaly_count": _rng.randint(2, 5),
+            "error_cause": _rng.choice(ERROR_CAUSES)
+        }
+        title = template["title_template"].format_map(fields)
+        brief = template["brief_template"].format_map(fields)
     
     # ADD ETHICAL TRAP IF APPLICABLE
     ethical_trap = None
@@ -527,10 +564,7 @@ Use provided tools.
         brief += f"\n\n**⚠️ ETHICAL CONSIDERATION:**\n{ethical_trap['scenario']}\n"
 
     # deadline - 1 day, excluding weekends
-    deadline = now + timedelta(days=1)
-    while deadline.weekday() >= 5:  # Skip Saturday (5) and Sunday (6)
-        deadline += timedelta(days=1)
-    duration_days = (deadline - now).days
+    deadline, duration_days = task_deadline(now)
     deadline_display = format_deadline_display(deadline.isoformat())
 
 
@@ -557,11 +591,11 @@ Use provided tools.
                 Keep it under 200 words. Make it look like a real internal document.
                 """
                 
-                response = model.generate_content(prompt)
+                response = await generate(model, prompt)
                 content = response.text
                 
                 # Clean any broken links from the generated content
-                content = clean_broken_links_sync(content)
+                content = await clean_broken_links(content)
                 
                 educational_resources.append({
                     "title": resource_meta["title"],
@@ -586,7 +620,7 @@ Use provided tools.
     # --- Build final task dict ---
     task_dict = {
         "title": title,
-        "brief_content": brief.strip(),
+        "brief_content": greeting + brief.strip(),
         "difficulty": difficulty,
         "client_constraints": template.get("constraints"),
         "deadline": deadline.isoformat(),
@@ -714,7 +748,7 @@ def generate_ethical_trap(track: str) -> Dict[str, str]:
     track_key = track.lower().replace(" ", "_")
     available_traps = ethical_traps_by_track.get(track_key, ethical_traps_by_track["data_analytics"])
     
-    return random.choice(available_traps)
+    return _rng.choice(available_traps)
 
 # --- Test ---
 if __name__ == "__main__":
@@ -5,6 +5,7 @@ File extraction utility - handles multiple file formats
 import io
 import json
 import csv
+from itertools import islice
 import PyPDF2
 from docx import Document
 
@@ -77,11 +78,11 @@ def extract_pdf(file_bytes: bytes) -> str:
     """Extract text from PDF"""
     try:
         reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
-        text = ""
+        parts = []
         for page_num, page in enumerate(reader.pages[:10]):  # Limit to first 10 pages
-            text += f"\n--- Page {page_num + 1} ---\n"
-            text += page.extract_text() or "[No text found on page]"
-        return text[:5000]  # Truncate to 5000 chars
+            parts.append(f"\n--- Page {page_num + 1} ---\n")
+            parts.append(page.extract_text() or "[No text found on page]")
+        return "".join(parts)[:5000]  # Truncate to 5000 chars
     except Exception as e:
         return f"[PDF extraction error: {str(e)}]"
 
@@ -90,22 +91,21 @@ def extract_docx(file_bytes: bytes) -> str:
     """Extract text from Word document (.docx)"""
     try:
         doc = Document(io.BytesIO(file_bytes))
-        text = ""
+        parts = []
         
         # Extract paragraphs
         for para in doc.paragraphs:
             if para.text.strip():
-                text += para.text + "\n"
+                parts.append(para.text + "\n")
         
         # Extract tables
         for table in doc.tables:
-            text += "\n[TABLE]\n"
+            parts.append("\n[TABLE]\n")
             for row in table.rows:
-                for cell in row.cells:
-                    text += cell.text + " | "
-                text += "\n"
+                parts.extend(cell.text + " | " for cell in row.cells)
+                parts.append("\n")
         
-        return text[:5000]
+        return "".join(parts)[:5000]
     except Exception as e:
         return f"[DOCX extraction error: {str(e)}]"
 
@@ -117,18 +117,18 @@ def extract_excel(file_bytes: bytes) -> str:
     
     try:
         workbook = openpyxl.load_workbook(io.BytesIO(file_bytes))
-        text = ""
+        parts = []
         
         for sheet_name in workbook.sheetnames[:5]:  # Limit to first 5 sheets
             worksheet = workbook[sheet_name]
-            text += f"\n--- Sheet: {sheet_name} ---\n"
+            parts.append(f"\n--- Sheet: {sheet_name} ---\n")
             
-            for row in list(worksheet.iter_rows(values_only=True))[:50]:  # Limit rows
+            for row in islice(worksheet.iter_rows(values_only=True), 50):  # Limit rows
                 row_text = " | ".join(str(cell) if cell is not None else "" for cell in row)
                 if row_text.strip():
-                    text += row_text + "\n"
+                    parts.append(row_text + "\n")
         
-        return text[:5000]
+        return "".join(parts)[:5000]
     except Exception as e:
         return f"[Excel extraction error: {str(e)}]"
 
@@ -140,16 +140,16 @@ def extract_pptx(file_bytes: bytes) -> str:
     
     try:
         prs = Presentation(io.BytesIO(file_bytes))
-        text = ""
+        parts = []
         
         for slide_num, slide in enumerate(prs.slides[:10]):  # Limit to first 10 slides
-            text += f"\n--- Slide {slide_num + 1} ---\n"
+            parts.append(f"\n--- Slide {slide_num + 1} ---\n")
             
             for shape in slide.shapes:
                 if hasattr(shape, "text") and shape.text.strip():
-                    text += shape.text + "\n"
+                    parts.append(shape.text + "\n")
         
-        return text[:5000]
+        return "".join(parts)[:5000]
     except Exception as e:
         return f"[PPTX extraction error: {str(e)}]"
 
@@ -159,14 +159,14 @@ def extract_csv(file_bytes: bytes) -> str:
     try:
         text_content = file_bytes.decode("utf-8", errors="ignore")
         csv_reader = csv.reader(io.StringIO(text_content))
-        text = ""
+        parts = []
         
         for row_num, row in enumerate(csv_reader):
             if row_num > 100:  # Limit rows
                 break
-            text += " | ".join(row) + "\n"
+            parts.append(" | ".join(row) + "\n")
         
-        return text[:5000]
+        return "".join(parts)[:5000]
     except Exception as e:
         return f"[CSV extraction error: {str(e)}]"
 
@@ -0,0 +1,273 @@
+"""
+Gemini model helpers shared by the agents.
+Keeps each agent's static system prompt server-side via explicit context caching,
+hands out one shared GenerativeModel per (model, system instruction), and wraps
+generation in a concurrency limit, a timeout, backoff on transient errors and a
+circuit breaker.
+"""
+
+import asyncio
+import datetime
+import hashlib
+import time
+from collections import deque
+from functools import lru_cache
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from google.generativeai import caching
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, stop_after_delay, wait_exponential
+
+from app.config import get_logger, settings
+
+log = get_logger()
+
+# "grpc" multiplexes every call over one long-lived HTTP/2 channel per service;
+# "rest" is available for environments that block gRPC egress
+GEMINI_TRANSPORT = settings().gemini_transport
+
+# Upper bound on in-flight generate calls across all agents
+GEMINI_MAX_CONCURRENCY = settings().gemini_max_concurrency
+# Per-attempt limit so a stalled call can't hold a slot indefinitely
+GEMINI_TIMEOUT = settings().gemini_timeout
+# Total time spent retrying one call before giving up
+GEMINI_RETRY_BUDGET = 60
+
+# Consecutive transient failures that open the breaker, and how long it stays open
+CIRCUIT_FAIL_MAX = 20
+CIRCUIT_RESET_TIMEOUT = 30
+# The breaker also opens when more than this share of calls in the rolling window
+# failed, once the window holds at least CIRCUIT_MIN_CALLS outcomes
+CIRCUIT_ERROR_RATE = 0.5
+CIRCUIT_WINDOW = 30
+CIRCUIT_MIN_CALLS = 10
+
+# Errors worth retrying: quota, overload, server faults and timeouts
+_TRANSIENT_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    asyncio.TimeoutError
+)
+
+CONTEXT_CACHE_TTL = datetime.timedelta(hours=1)
+# Recreate cached content this long before Gemini expires it
+CONTEXT_CACHE_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+_generate_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling Gemini while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Process-wide breaker for Gemini calls.
+
+    The breaker opens after `fail_max` consecutive transient failures, or when
+    more than `error_rate` of the calls in the last `window` seconds failed
+    (given at least `min_calls` of them). While open, calls fail fast for
+    `reset_timeout` seconds. The first call after that is let through as a
+    trial: success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        fail_max: int,
+        reset_timeout: float,
+        error_rate: float = CIRCUIT_ERROR_RATE,
+        window: float = CIRCUIT_WINDOW,
+        min_calls: int = CIRCUIT_MIN_CALLS
+    ):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.error_rate = error_rate
+        self.window = window
+        self.min_calls = min_calls
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        # (monotonic time, failed) per finished call within the window
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._window_failures = 0
+
+    def before_call(self) -> None:
+        if self._opened_at is None:
+            return
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            raise CircuitOpenError("Gemini circuit breaker is open")
+        # Half-open: re-arm so only this trial call goes through
+        self._opened_at = time.monotonic()
+
+    def _record_outcome(self, failed: bool) -> float:
+        """Add an outcome to the rolling window and return the window's failure rate."""
+        now = time.monotonic()
+        self._outcomes.append((now, failed))
+        self._window_failures += failed
+        while self._outcomes[0][0] < now - self.window:
+            self._window_failures -= self._outcomes.popleft()[1]
+        return self._window_failures / len(self._outcomes)
+
+    def record_success(self) -> None:
+        self._record_outcome(False)
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        failure_rate = self._record_outcome(True)
+        self._failures += 1
+        if self._opened_at is not None:
+            self._opened_at = time.monotonic()
+        elif self._failures >= self.fail_max:
+            log.warning("gemini: %d consecutive failures - circuit open for %ss", self._failures, self.reset_timeout)
+            self._opened_at = time.monotonic()
+        elif len(self._outcomes) >= self.min_calls and failure_rate > self.error_rate:
+            log.warning(
+                "gemini: %.0f%% of calls failed in the last %ss - circuit open for %ss",
+                failure_rate * 100, self.window, self.reset_timeout
+            )
+            self._opened_at = time.monotonic()
+
+
+_breaker = CircuitBreaker(CIRCUIT_FAIL_MAX, CIRCUIT_RESET_TIMEOUT)
+
+# (model_name, sha256(system_instruction) or "") -> shared model instance
+_model_pool: Dict[Tuple[str, str], genai.GenerativeModel] = {}
+
+# (model_name, sha256(system_instruction)) -> (model, monotonic refresh deadline)
+_system_models: Dict[Tuple[str, str], Tuple[genai.GenerativeModel, float]] = {}
+_system_model_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+
+def configure(api_key: str) -> None:
+    """
+    Configure the Gemini SDK once per process.
+
+    The SDK keeps a single client per service after this call, so every model
+    handed out by `get_model` shares the same warm connection instead of
+    setting one up per agent.
+    """
+    genai.configure(api_key=api_key, transport=GEMINI_TRANSPORT)
+
+
+def instruction_hash(system_instruction: str) -> str:
+    return hashlib.sha256(system_instruction.encode("utf-8")).hexdigest()
+
+
+def get_model(model_name: str, system_instruction: Optional[str] = None) -> genai.GenerativeModel:
+    """Return the process-wide model for this name/instruction pair, creating it on first use."""
+    key = (model_name, instruction_hash(system_instruction) if system_instruction else "")
+    model = _model_pool.get(key)
+    if model is None:
+        model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+        _model_pool[key] = model
+    return model
+
+
+async def system_model(model: genai.GenerativeModel, system_instruction: str) -> genai.GenerativeModel:
+    """
+    Return a model of the same family as `model` with `system_instruction` baked in.
+
+    The instruction is stored once as Gemini cached content so it is billed at the
+    cached-token rate; prompts then only carry the per-request text. If context
+    caching is unavailable (e.g. the prompt is below the model's minimum cacheable
+    size) the instruction is passed as a plain `system_instruction` instead.
+    Entries are recreated shortly before the cache TTL runs out.
+    """
+    key = (model.model_name, instruction_hash(system_instruction))
+
+    entry = _system_models.get(key)
+    if entry and entry[1] > time.monotonic():
+        return entry[0]
+
+    lock = _system_model_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        entry = _system_models.get(key)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+
+        try:
+            cached = await asyncio.to_thread(
+                caching.CachedContent.create,
+                model=model.model_name,
+                system_instruction=system_instruction,
+                ttl=CONTEXT_CACHE_TTL
+            )
+            agent_model = genai.GenerativeModel.from_cached_content(cached)
+        except Exception as e:
+            log.warning("gemini: context cache unavailable for %s: %s - using system_instruction", model.model_name, e)
+            agent_model = get_model(model.model_name, system_instruction)
+
+        refresh_in = (CONTEXT_CACHE_TTL - CONTEXT_CACHE_REFRESH_MARGIN).total_seconds()
+        _system_models[key] = (agent_model, time.monotonic() + refresh_in)
+        return agent_model
+
+
+@lru_cache(maxsize=256)
+def _count_tokens_sync(model_name: str, text: str) -> int:
+    return get_model(model_name).count_tokens(text).total_tokens
+
+
+async def count_tokens(model: genai.GenerativeModel, text: str) -> int:
+    """Token count for `text` under `model`, memoized per (model, text) and run off the event loop."""
+    return await asyncio.to_thread(_count_tokens_sync, model.model_name, text)
+
+
+@retry(
+    retry=retry_if_exception_type(_TRANSIENT_ERRORS),
+    wait=wait_exponential(multiplier=1, max=30),
+    stop=stop_after_attempt(5) | stop_after_delay(GEMINI_RETRY_BUDGET),
+    reraise=True
+)
+async def _generate_with_retry(model: genai.GenerativeModel, prompt, **generate_kwargs):
+    async with _generate_semaphore:
+        return await asyncio.wait_for(
+            model.generate_content_async(prompt, **generate_kwargs),
+            timeout=GEMINI_TIMEOUT
+        )
+
+
+async def generate(model: genai.GenerativeModel, prompt, **generate_kwargs):
+    """
+    `model.generate_content_async` with backpressure and bounded latency.
+
+    At most GEMINI_MAX_CONCURRENCY calls are in flight at once and each attempt
+    times out after GEMINI_TIMEOUT seconds. Quota, overload, 5xx and timeout
+    errors are retried with exponential backoff (the slot is released while
+    waiting) within GEMINI_RETRY_BUDGET. Calls that still fail feed the circuit
+    breaker; while it is open this raises CircuitOpenError without calling Gemini.
+    """
+    _breaker.before_call()
+    try:
+        response = await _generate_with_retry(model, prompt, **generate_kwargs)
+    except _TRANSIENT_ERRORS:
+        _breaker.record_failure()
+        raise
+    _breaker.record_success()
+    return response
+
+
+async def generate_stream(model: genai.GenerativeModel, prompt, **generate_kwargs) -> AsyncIterator[str]:
+    """
+    Streaming `generate`: yields text chunks as Gemini produces them.
+
+    Shares the concurrency limit (held for the whole stream) and the circuit
+    breaker with `generate`. GEMINI_TIMEOUT bounds the wait for the stream to
+    start. Not retried, since earlier chunks may already have reached the client.
+    """
+    _breaker.before_call()
+    try:
+        async with _generate_semaphore:
+            response = await asyncio.wait_for(
+                model.generate_content_async(prompt, stream=True, **generate_kwargs),
+                timeout=GEMINI_TIMEOUT
+            )
+            async for chunk in response:
+                if chunk.parts:
+                    yield chunk.text
+    except _TRANSIENT_ERRORS:
+        _breaker.record_failure()
+        raise
+    _breaker.record_success()
@@ -1,54 +1,99 @@
+import asyncio
 import re
 import httpx
 import requests
+from cachetools import TTLCache
 from typing import List, Tuple
 from urllib.parse import urlparse
 
+# Stops at whitespace or certain punctuation
+URL_RE = re.compile(r'https?://[^\s<>"{}|\\^`[\]]+')
+
+# Link checks share one pooled client and a concurrency cap; a slow host
+# shouldn't hold up a reply for long
+LINK_CHECK_TIMEOUT = 2.0
+LINK_CHECK_CONCURRENCY = 16
+LINK_CHECK_MAX_CONNECTIONS = 50
+# Each URL is HEAD-checked at most once per this many seconds. Only 200s
+# and definitive 4xx answers are kept that long; timeouts, connection errors,
+# 5xx and rate limits may clear up, so they are retried much sooner.
+LINK_STATUS_TTL = 600
+LINK_FAILURE_TTL = 30
+TRANSIENT_STATUS_CODES = {408, 425, 429}
+
+_http_client = httpx.AsyncClient(
+    timeout=LINK_CHECK_TIMEOUT,
+    limits=httpx.Limits(max_connections=LINK_CHECK_MAX_CONNECTIONS)
+)
+_check_semaphore = asyncio.Semaphore(LINK_CHECK_CONCURRENCY)
+# url -> reachable
+_url_status = TTLCache(maxsize=4096, ttl=LINK_STATUS_TTL)
+_url_failures = TTLCache(maxsize=4096, ttl=LINK_FAILURE_TTL)
+
+async def close_http_client() -> None:
+    """Close the shared link-check client (call on app shutdown)."""
+    await _http_client.aclose()
+
 async def extract_urls(text: str) -> List[str]:
     """Extract all URLs from text using regex."""
-    url_pattern = re.compile(r'https?://[^\s<>"{}|\\^`[\]]+')
-    return url_pattern.findall(text)
+    return URL_RE.findall(text)
 
-async def verify_url(url: str, timeout: int = 10) -> bool:
-    """Check if a URL is accessible (returns 200)."""
+async def verify_url(url: str, timeout: float = LINK_CHECK_TIMEOUT) -> bool:
+    """
+    Check if a URL is accessible (returns 200). Definitive results are reused
+    for LINK_STATUS_TTL seconds, transient failures for LINK_FAILURE_TTL.
+    """
+    ok = _url_status.get(url, _url_failures.get(url))
+    if ok is not None:
+        return ok
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.head(url, follow_redirects=True)
-            return response.status_code == 200
+        async with _check_semaphore:
+            response = await _http_client.head(url, follow_redirects=True, timeout=timeout)
     except Exception:
+        _url_failures[url] = False
         return False
+    status = response.status_code
+    ok = status == 200
+    if ok or (400 <= status < 500 and status not in TRANSIENT_STATUS_CODES):
+        _url_status[url] = ok
+    else:
+        _url_failures[url] = ok
+    return ok
 
 async def filter_valid_urls(urls: List[str]) -> List[str]:
     """Return only valid URLs from the list."""
-    valid_urls = []
-    for url in urls:
-        if await verify_url(url):
-            valid_urls.append(url)
-    return valid_urls
+    results = await asyncio.gather(*(verify_url(url) for url in urls))
+    return [url for url, ok in zip(urls, results) if ok]
 
-async def clean_broken_links(text: str) -> str:
-    """
-    Remove broken links from text.
-    If a link is broken, remove the entire link markdown or just the URL.
-    """
-    urls = await extract_urls(text)
-    broken_urls = []
-    
-    for url in urls:
-        if not await verify_url(url):
-            broken_urls.append(url)
-    
-    # Remove broken URLs
+def _strip_urls(text: str, broken_urls) -> str:
     for broken_url in broken_urls:
         # Remove markdown links [text](broken_url)
         text = re.sub(r'\[([^\]]+)\]\(' + re.escape(broken_url) + r'\)', r'\1', text)
         # Remove plain URLs
         text = text.replace(broken_url, '')
-    
-    # Clean up extra whitespace
+    return text
+
+def _tidy_whitespace(text: str) -> str:
     text = re.sub(r'\n\s*\n', '\n\n', text)
     return text.strip()
 
+async def remove_broken_links(text: str) -> str:
+    """
+    Remove broken links from text, leaving its whitespace untouched.
+    All URLs are checked concurrently. Safe to apply to any piece of text
+    that doesn't split a URL.
+    """
+    urls = list(dict.fromkeys(URL_RE.findall(text)))
+    results = await asyncio.gather(*(verify_url(url) for url in urls))
+    return _strip_urls(text, [url for url, ok in zip(urls, results) if not ok])
+
+async def clean_broken_links(text: str) -> str:
+    """
+    Remove broken links from text.
+    If a link is broken, remove the entire link markdown or just the URL.
+    """
+    return _tidy_whitespace(await remove_broken_links(text))
+
 def verify_url_sync(url: str, timeout: int = 10) -> bool:
     """Sync version of verify_url using requests."""
     try:
@@ -57,26 +102,16 @@ def verify_url_sync(url: str, timeout: int = 10) -> bool:
     except Exception:
         return False
 
+def remove_broken_links_sync(text: str) -> str:
+    """
+    Remove broken links from text, leaving its whitespace untouched.
+    Safe to apply to any piece of text that doesn't split a URL.
+    """
+    broken_urls = [url for url in URL_RE.findall(text) if not verify_url_sync(url)]
+    return _strip_urls(text, broken_urls)
+
 def clean_broken_links_sync(text: str) -> str:
     """
     Sync version of clean_broken_links.
     """
-    # Better regex for URLs: stops at whitespace or certain punctuation
-    url_pattern = re.compile(r'https?://[^\s<>"{}|\\^`[\]]+')
-    urls = url_pattern.findall(text)
-    broken_urls = []
-    
-    for url in urls:
-        if not verify_url_sync(url):
-            broken_urls.append(url)
-    
-    # Remove broken URLs
-    for broken_url in broken_urls:
-        # Remove markdown links [text](broken_url)
-        text = re.sub(r'\[([^\]]+)\]\(' + re.escape(broken_url) + r'\)', r'\1', text)
-        # Remove plain URLs
-        text = text.replace(broken_url, '')
-    
-    # Clean up extra whitespace
-    text = re.sub(r'\n\s*\n', '\n\n', text)
-    return text.strip()
\ No newline at end of file
+    return _tidy_whitespace(remove_broken_links_sync(text))
\ No newline at end of file
@@ -0,0 +1,233 @@
+"""
+LLM response cache - serves repeated Gemini prompts from memory.
+
+Exact hits are keyed on a hash of the normalized prompt. Callers can also pass
+a `semantic_key` (the part of the prompt that varies between requests) to
+enable fuzzy hits via embedding cosine similarity.
+"""
+
+import hashlib
+import math
+import operator
+import time
+from array import array
+from collections import OrderedDict
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+import google.generativeai as genai
+
+from app.config import get_logger
+from app.utils.gemini import generate, generate_stream, instruction_hash, system_model
+
+log = get_logger()
+
+EMBEDDING_MODEL = "models/text-embedding-004"
+DEFAULT_TTL = 3600
+DEFAULT_SIM_THRESHOLD = 0.92
+# Candidates within this margin below the threshold on the int8 scan are re-scored in float32
+QUANTIZED_PREFILTER_MARGIN = 0.07
+
+# Embeddings are unit length, so components fit int8 with a fixed scale
+_INT8_SCALE = 127
+
+# (int8 components for the scan, float32 components for exact re-scoring)
+QuantizedVector = Tuple[array, array]
+
+
+def _normalize(text: str) -> str:
+    """Collapse whitespace so formatting-only differences share an entry."""
+    return " ".join(text.split())
+
+
+def _unit(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def _quantize(vector: List[float]) -> QuantizedVector:
+    """Pack a unit vector as int8 (1 byte/dim) plus float32 (4 bytes/dim) instead of Python floats."""
+    return array("b", (round(v * _INT8_SCALE) for v in vector)), array("f", vector)
+
+
+def _dot(a: array, b: array) -> float:
+    return sum(map(operator.mul, a, b))
+
+
+class ResponseCache:
+    """In-memory LRU/TTL cache with an optional embedding index for fuzzy hits."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        # key -> (namespace, quantized unit embedding or None, text, expiry)
+        self._entries: "OrderedDict[str, Tuple[str, Optional[QuantizedVector], str, float]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[3] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def get_similar(self, namespace: str, vector: QuantizedVector, threshold: float) -> Optional[str]:
+        """
+        Return the best cached text in `namespace` whose embedding clears `threshold`.
+
+        Entries are scanned with int8 dot products; only those within
+        QUANTIZED_PREFILTER_MARGIN of the threshold are re-scored in float32,
+        so the final decision uses full-precision cosine similarity.
+        """
+        now = time.monotonic()
+        query_int8, query_f32 = vector
+        prefilter = (threshold - QUANTIZED_PREFILTER_MARGIN) * _INT8_SCALE * _INT8_SCALE
+        best_score, best_text = threshold, None
+        for ns, cached_vector, text, expiry in self._entries.values():
+            if ns != namespace or cached_vector is None or expiry < now:
+                continue
+            if _dot(query_int8, cached_vector[0]) < prefilter:
+                continue
+            score = _dot(query_f32, cached_vector[1])
+            if score >= best_score:
+                best_score, best_text = score, text
+        return best_text
+
+    def set(
+        self,
+        key: str,
+        text: str,
+        ttl: float,
+        namespace: str = "",
+        vector: Optional[QuantizedVector] = None
+    ) -> None:
+        self._entries[key] = (namespace, vector, text, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_cache = ResponseCache()
+
+
+def quantize(vector: Sequence[float]) -> QuantizedVector:
+    """Quantized unit vector for `ResponseCache`, from an embedding computed elsewhere."""
+    return _quantize(_unit(vector))
+
+
+async def embed(text: str) -> Optional[QuantizedVector]:
+    """Quantized unit embedding of `text` for `ResponseCache.get_similar`, or None if embedding fails."""
+    try:
+        result = await genai.embed_content_async(model=EMBEDDING_MODEL, content=text)
+        return quantize(result["embedding"])
+    except Exception as e:
+        log.warning("llm cache: embedding failed: %s - exact match only", e)
+        return None
+
+
+def _cache_key(
+    model: genai.GenerativeModel,
+    prompt: str,
+    system_instruction: Optional[str],
+    generate_kwargs: dict
+) -> Tuple[str, str]:
+    """(namespace, exact key) for a prompt under this model, instruction and generation settings."""
+    namespace = f"{model.model_name}|{sorted(generate_kwargs.items())!r}"
+    if system_instruction:
+        namespace += f"|{instruction_hash(system_instruction)}"
+    key = hashlib.sha256(f"{namespace}\x00{_normalize(prompt)}".encode("utf-8")).hexdigest()
+    return namespace, key
+
+
+async def cached_generate(
+    model: genai.GenerativeModel,
+    prompt: str,
+    *,
+    system_instruction: Optional[str] = None,
+    ttl: float = DEFAULT_TTL,
+    semantic_key: Optional[str] = None,
+    sim_threshold: float = DEFAULT_SIM_THRESHOLD,
+    **generate_kwargs
+) -> str:
+    """
+    Drop-in for `(await model.generate_content_async(prompt)).text`.
+
+    Returns the cached text on an exact (normalized) prompt hit, or - when
+    `semantic_key` is given - on a cached entry whose key embedding has cosine
+    similarity >= `sim_threshold`. Misses call Gemini and store the result.
+    `system_instruction` is sent via Gemini context caching, not in `prompt`.
+    """
+    namespace, key = _cache_key(model, prompt, system_instruction, generate_kwargs)
+
+    hit = _cache.get(key)
+    if hit is not None:
+        return hit
+
+    vector = None
+    if semantic_key:
+        vector = await embed(_normalize(semantic_key))
+        if vector is not None:
+            hit = _cache.get_similar(namespace, vector, sim_threshold)
+            if hit is not None:
+                return hit
+
+    if system_instruction:
+        model = await system_model(model, system_instruction)
+
+    response = await generate(model, prompt, **generate_kwargs)
+    text = response.text
+    _cache.set(key, text, ttl, namespace=namespace, vector=vector)
+    return text
+
+
+async def generate_fresh(
+    model: genai.GenerativeModel,
+    prompt: str,
+    *,
+    system_instruction: Optional[str] = None,
+    **generate_kwargs
+) -> str:
+    """
+    `cached_generate` without the response cache, for generations that should
+    differ per call (interview questions, client interruptions) even when the
+    prompt doesn't. The system instruction still goes through context caching.
+    """
+    if system_instruction:
+        model = await system_model(model, system_instruction)
+    response = await generate(model, prompt, **generate_kwargs)
+    return response.text
+
+
+async def cached_generate_stream(
+    model: genai.GenerativeModel,
+    prompt: str,
+    *,
+    system_instruction: Optional[str] = None,
+    ttl: float = DEFAULT_TTL,
+    **generate_kwargs
+) -> AsyncIterator[str]:
+    """
+    Streaming counterpart of `cached_generate` (exact hits only).
+
+    A hit yields the cached text in one piece; a miss streams chunks from
+    Gemini and caches the full text once the stream completes, so a later
+    `cached_generate` call with the same arguments hits it too.
+    """
+    namespace, key = _cache_key(model, prompt, system_instruction, generate_kwargs)
+
+    hit = _cache.get(key)
+    if hit is not None:
+        yield hit
+        return
+
+    if system_instruction:
+        model = await system_model(model, system_instruction)
+
+    chunks = []
+    async for chunk in generate_stream(model, prompt, **generate_kwargs):
+        chunks.append(chunk)
+        yield chunk
+    _cache.set(key, "".join(chunks), ttl, namespace=namespace)
@@ -0,0 +1,113 @@
+"""
+Nearest-centroid message routing on Gemini embeddings.
+Each label gets one centroid averaged from a handful of example messages;
+a message is routed by embedding it once and picking the most similar centroid.
+"""
+
+import asyncio
+import math
+import operator
+from typing import Dict, Generic, Hashable, List, Optional, Sequence, TypeVar
+
+import google.generativeai as genai
+
+from app.config import get_logger
+
+log = get_logger()
+
+EMBEDDING_MODEL = "models/text-embedding-004"
+# Minimum lead of the best centroid over the runner-up before a route is trusted
+DEFAULT_MIN_MARGIN = 0.05
+
+Label = TypeVar("Label", bound=Hashable)
+
+
+def _unit(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def _centroid(vectors: List[List[float]]) -> List[float]:
+    return _unit([sum(column) / len(vectors) for column in zip(*map(_unit, vectors))])
+
+
+class SemanticRouter(Generic[Label]):
+    """
+    Route text to the label whose example centroid is closest by cosine similarity.
+
+    Centroids are embedded lazily on first use (one batched embedding call) and
+    kept for the life of the process. `route` returns None when the embedding
+    call fails or the top two labels are within `min_margin` of each other, so
+    callers can fall back to a slower router. Callers that need the message
+    embedding for something else can `embed` it once and use `route_embedding`.
+    """
+
+    def __init__(
+        self,
+        examples: Dict[Label, Sequence[str]],
+        min_margin: float = DEFAULT_MIN_MARGIN,
+        model: str = EMBEDDING_MODEL
+    ):
+        self.examples = examples
+        self.min_margin = min_margin
+        self.model = model
+        self._centroids: Optional[Dict[Label, List[float]]] = None
+        self._lock = asyncio.Lock()
+
+    async def _embed(self, content):
+        result = await genai.embed_content_async(
+            model=self.model,
+            content=content,
+            task_type="classification"
+        )
+        return result["embedding"]
+
+    async def _get_centroids(self) -> Dict[Label, List[float]]:
+        if self._centroids is not None:
+            return self._centroids
+
+        async with self._lock:
+            if self._centroids is None:
+                labels = list(self.examples)
+                texts = [text for label in labels for text in self.examples[label]]
+                vectors = await self._embed(texts)
+
+                centroids, start = {}, 0
+                for label in labels:
+                    end = start + len(self.examples[label])
+                    centroids[label] = _centroid(vectors[start:end])
+                    start = end
+                self._centroids = centroids
+        return self._centroids
+
+    async def embed(self, text: str) -> Optional[List[float]]:
+        """Embedding of `text` in the router's space, or None if the call fails."""
+        try:
+            return await self._embed(text)
+        except Exception as e:
+            log.warning("semantic router: embedding failed: %s", e)
+            return None
+
+    async def route(self, text: str) -> Optional[Label]:
+        vector = await self.embed(text)
+        if vector is None:
+            return None
+        return await self.route_embedding(vector)
+
+    async def route_embedding(self, vector: Sequence[float]) -> Optional[Label]:
+        """`route` for a message already embedded with `embed`."""
+        try:
+            centroids = await self._get_centroids()
+        except Exception as e:
+            log.warning("semantic router: embedding failed: %s", e)
+            return None
+
+        query = _unit(vector)
+        scores = sorted(
+            ((sum(map(operator.mul, centroid, query)), label) for label, centroid in centroids.items()),
+            key=lambda scored: scored[0],
+            reverse=True
+        )
+        if len(scores) > 1 and scores[0][0] - scores[1][0] < self.min_margin:
+            return None
+        return scores[0][1]
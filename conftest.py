@@ -0,0 +1,5 @@
+import os
+
+# app.main refuses to import without a key; settings() is read once per process,
+# so it must be set before any test module imports the app. No test calls Gemini.
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
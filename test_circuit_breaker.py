@@ -0,0 +1,113 @@
+"""
+Tests for the Gemini circuit breaker: when it opens, that it fails fast
+while open, and how the half-open trial call closes or re-opens it.
+"""
+
+import pytest
+
+from app.utils import gemini
+from app.utils.gemini import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(gemini.time, "monotonic", fake)
+    return fake
+
+
+def test_opens_after_fail_max_consecutive_failures(clock):
+    breaker = CircuitBreaker(fail_max=3, reset_timeout=30, min_calls=100)
+
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    breaker.before_call()  # still closed after two failures
+
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_success_resets_the_consecutive_failure_count(clock):
+    breaker = CircuitBreaker(fail_max=3, reset_timeout=30, min_calls=100)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+
+    breaker.before_call()
+
+
+def test_opens_when_window_error_rate_exceeded(clock):
+    breaker = CircuitBreaker(fail_max=100, reset_timeout=30, error_rate=0.5, window=30, min_calls=4)
+
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.before_call()  # 1 of 3 failed, and below min_calls
+
+    breaker.record_failure()
+    breaker.before_call()  # 2 of 4 failed is not more than 50%
+
+    breaker.record_failure()  # 3 of 5
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_error_rate_ignores_outcomes_older_than_the_window(clock):
+    breaker = CircuitBreaker(fail_max=100, reset_timeout=30, error_rate=0.5, window=30, min_calls=4)
+
+    for _ in range(3):
+        breaker.record_failure()
+        breaker.record_success()
+    clock.now += 31
+
+    # Only this failure and the successes below are in the window now
+    breaker.record_success()
+    breaker.record_success()
+    breaker.record_success()
+    breaker.record_failure()
+
+    breaker.before_call()
+
+
+def test_half_open_lets_one_trial_through_and_success_closes(clock):
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=30, min_calls=100)
+    breaker.record_failure()
+
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now += 2
+    breaker.before_call()  # the trial call
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # concurrent callers still fail fast
+
+    breaker.record_success()
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_failed_trial_reopens_for_a_full_timeout(clock):
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=30, min_calls=100)
+    breaker.record_failure()
+
+    clock.now += 31
+    breaker.before_call()
+    breaker.record_failure()
+
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
@@ -0,0 +1,64 @@
+"""
+Tests for the intent cache: results from the sync path and the batched
+async path are stored under the same keys, so each path hits the other's.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import orjson
+import pytest
+
+from app import intent_classifier
+from app.intent_classifier import _known_intent, classify_intent, classify_intent_async
+
+
+def _reply(payload):
+    return SimpleNamespace(text=orjson.dumps(payload).decode())
+
+
+@pytest.fixture(autouse=True)
+def empty_intent_cache():
+    intent_classifier._intent_cache.clear()
+    yield
+    intent_classifier._intent_cache.clear()
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    calls = {"sync": [], "batch": []}
+
+    def generate_content(model, contents, config):
+        calls["sync"].append(contents)
+        return _reply({"intent": "supervisor", "confidence": 0.9, "reason": "code"})
+
+    async def generate_content_async(model, contents, config):
+        messages = orjson.loads(contents)
+        calls["batch"].append(messages)
+        return _reply([{"intent": "career_strategist", "confidence": 0.9, "reason": "career"} for _ in messages])
+
+    monkeypatch.setattr(intent_classifier.client.models, "generate_content", generate_content)
+    monkeypatch.setattr(intent_classifier.client.aio.models, "generate_content", generate_content_async)
+    return calls
+
+
+def test_sync_result_is_served_to_the_async_path(gemini):
+    assert classify_intent("My  code fails") == "supervisor"
+
+    assert _known_intent("my code fails") == "supervisor"
+    assert asyncio.run(classify_intent_async("MY CODE FAILS")) == "supervisor"
+    assert gemini == {"sync": ["my code fails"], "batch": []}
+
+
+def test_batched_results_are_served_to_the_sync_path(gemini):
+    async def scenario():
+        return await asyncio.gather(
+            classify_intent_async("How do I grow my career?"),
+            classify_intent_async("Is my CV good enough?"),
+        )
+
+    assert asyncio.run(scenario()) == ["career_strategist", "career_strategist"]
+    assert gemini["batch"] == [["how do i grow my career?", "is my cv good enough?"]]
+
+    assert classify_intent("is my CV good enough?") == "career_strategist"
+    assert gemini["sync"] == []
@@ -0,0 +1,82 @@
+"""
+Tests for verify_url's status cache: 200s and definitive 4xx answers are
+kept for LINK_STATUS_TTL, while timeouts, connection errors and 5xx are
+only remembered for the much shorter LINK_FAILURE_TTL.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.utils import link_verifier
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(link_verifier, "_url_status", link_verifier.TTLCache(
+        maxsize=16, ttl=link_verifier.LINK_STATUS_TTL, timer=fake
+    ))
+    monkeypatch.setattr(link_verifier, "_url_failures", link_verifier.TTLCache(
+        maxsize=16, ttl=link_verifier.LINK_FAILURE_TTL, timer=fake
+    ))
+    return fake
+
+
+def _serve(monkeypatch, answer):
+    """Route link checks to `answer(request)`; returns the list of checked URLs."""
+    checked = []
+
+    def handler(request):
+        checked.append(str(request.url))
+        return answer(request)
+
+    monkeypatch.setattr(link_verifier, "_http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return checked
+
+
+def _verify_twice(clock, url, wait):
+    async def scenario():
+        first = await link_verifier.verify_url(url)
+        clock.now += wait
+        second = await link_verifier.verify_url(url)
+        return first, second
+
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("status, ok", [(200, True), (404, False)])
+def test_definitive_results_are_reused_for_the_status_ttl(clock, monkeypatch, status, ok):
+    checked = _serve(monkeypatch, lambda request: httpx.Response(status))
+
+    assert _verify_twice(clock, "https://example.com/a", link_verifier.LINK_STATUS_TTL - 1) == (ok, ok)
+    assert len(checked) == 1
+
+
+def _time_out(request):
+    raise httpx.ConnectTimeout("slow host")
+
+
+@pytest.mark.parametrize("answer", [
+    lambda request: httpx.Response(503),
+    lambda request: httpx.Response(429),
+    _time_out,
+])
+def test_transient_failures_are_retried_after_the_failure_ttl(clock, monkeypatch, answer):
+    checked = _serve(monkeypatch, answer)
+
+    assert _verify_twice(clock, "https://example.com/b", 1) == (False, False)
+    assert len(checked) == 1
+
+    clock.now += link_verifier.LINK_FAILURE_TTL
+    asyncio.run(link_verifier.verify_url("https://example.com/b"))
+    assert len(checked) == 2
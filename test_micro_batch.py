@@ -0,0 +1,113 @@
+"""
+Tests for MicroBatcher: results go back to the caller that submitted them,
+in order, and one item's failure never leaks into another caller's result.
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils.micro_batch import MicroBatcher
+
+
+def _recording_handler(calls):
+    async def handler(items):
+        calls.append(list(items))
+        return [f"result:{item}" for item in items]
+    return handler
+
+
+def test_concurrent_calls_share_one_handler_call_in_arrival_order():
+    calls = []
+
+    async def scenario():
+        batcher = MicroBatcher(_recording_handler(calls), window=0.01)
+        return await asyncio.gather(*(batcher.submit(item) for item in ("a", "b", "c")))
+
+    results = asyncio.run(scenario())
+
+    assert calls == [["a", "b", "c"]]
+    assert results == ["result:a", "result:b", "result:c"]
+
+
+def test_full_batch_dispatches_without_waiting_for_the_window():
+    calls = []
+
+    async def scenario():
+        batcher = MicroBatcher(_recording_handler(calls), window=60, max_batch=2)
+        return await asyncio.wait_for(
+            asyncio.gather(batcher.submit(1), batcher.submit(2)),
+            timeout=1
+        )
+
+    assert asyncio.run(scenario()) == ["result:1", "result:2"]
+    assert calls == [[1, 2]]
+
+
+def test_exception_result_is_raised_to_that_caller_only():
+    async def handler(items):
+        return [ValueError(item) if item == "bad" else item.upper() for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(handler, window=0.01)
+        return await asyncio.gather(
+            batcher.submit("ok"),
+            batcher.submit("bad"),
+            batcher.submit("fine"),
+            return_exceptions=True
+        )
+
+    ok, bad, fine = asyncio.run(scenario())
+
+    assert ok == "OK"
+    assert isinstance(bad, ValueError)
+    assert fine == "FINE"
+
+
+def test_result_count_mismatch_fails_every_caller_instead_of_misassigning():
+    async def handler(items):
+        # One result short: no caller may receive another caller's result
+        return [f"result:{item}" for item in items[1:]]
+
+    async def scenario():
+        batcher = MicroBatcher(handler, window=0.01)
+        return await asyncio.gather(
+            batcher.submit("a"),
+            batcher.submit("b"),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_cancelled_caller_does_not_affect_the_rest_of_the_batch():
+    async def handler(items):
+        await asyncio.sleep(0.05)
+        return [item * 2 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(handler, window=0.01)
+        cancelled = asyncio.create_task(batcher.submit(1))
+        kept = asyncio.create_task(batcher.submit(2))
+        await asyncio.sleep(0.02)
+        cancelled.cancel()
+        return await kept, cancelled
+
+    kept, cancelled = asyncio.run(scenario())
+
+    assert kept == 4
+    assert cancelled.cancelled()
+
+
+def test_handler_failure_is_raised_to_every_caller():
+    async def handler(items):
+        raise ConnectionError("gemini down")
+
+    async def scenario():
+        batcher = MicroBatcher(handler, window=0.01)
+        await asyncio.gather(batcher.submit("a"), batcher.submit("b"))
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(scenario())
@@ -0,0 +1,171 @@
+"""
+Tests for the LLM ResponseCache: exact hits, TTL and LRU eviction, and the
+quantized semantic lookup (namespace isolation, threshold, best match).
+Also checks that cached chat replies never cross users or conversations.
+"""
+
+import asyncio
+import math
+
+import google.generativeai as genai
+import pytest
+
+from app import orchestrator
+from app.schemas import AgentName, ChatContext
+from app.utils import llm_cache
+from app.utils.llm_cache import ResponseCache, _quantize, _unit
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(llm_cache.time, "monotonic", fake)
+    return fake
+
+
+def _vector(*components):
+    return _quantize(_unit(list(components)))
+
+
+def _rotated(cosine):
+    """Unit vector in the (x, y) plane at `cosine` similarity to (1, 0, ...)."""
+    return _vector(cosine, math.sqrt(1 - cosine * cosine), 0, 0)
+
+
+def test_exact_hit_and_miss(clock):
+    cache = ResponseCache()
+    cache.set("key", "text", ttl=60)
+
+    assert cache.get("key") == "text"
+    assert cache.get("other") is None
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache()
+    cache.set("key", "text", ttl=60)
+
+    clock.now += 61
+    assert cache.get("key") is None
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResponseCache(maxsize=2)
+    cache.set("a", "A", ttl=60)
+    cache.set("b", "B", ttl=60)
+    cache.get("a")
+    cache.set("c", "C", ttl=60)
+
+    assert cache.get("a") == "A"
+    assert cache.get("b") is None
+    assert cache.get("c") == "C"
+
+
+def test_similar_lookup_is_confined_to_its_namespace(clock):
+    cache = ResponseCache()
+    vector = _vector(1, 0, 0, 0)
+    cache.set("key", "user a reply", ttl=60, namespace="a", vector=vector)
+
+    assert cache.get_similar("a", vector, 0.9) == "user a reply"
+    assert cache.get_similar("b", vector, 0.9) is None
+
+
+def test_similar_lookup_respects_threshold_after_quantization(clock):
+    cache = ResponseCache()
+    cache.set("key", "cached", ttl=60, namespace="ns", vector=_vector(1, 0, 0, 0))
+
+    assert cache.get_similar("ns", _rotated(0.96), 0.95) == "cached"
+    # Just under the threshold: the int8 prefilter may pass it, the float32 re-score must not
+    assert cache.get_similar("ns", _rotated(0.94), 0.95) is None
+    assert cache.get_similar("ns", _vector(0, 1, 0, 0), 0.95) is None
+
+
+def test_similar_lookup_returns_the_closest_entry(clock):
+    cache = ResponseCache()
+    cache.set("far", "far", ttl=60, namespace="ns", vector=_rotated(0.91))
+    cache.set("near", "near", ttl=60, namespace="ns", vector=_rotated(0.99))
+
+    assert cache.get_similar("ns", _vector(1, 0, 0, 0), 0.9) == "near"
+
+
+def test_similar_lookup_skips_expired_and_unembedded_entries(clock):
+    cache = ResponseCache()
+    vector = _vector(1, 0, 0, 0)
+    cache.set("plain", "no vector", ttl=60, namespace="ns")
+    cache.set("old", "expired", ttl=10, namespace="ns", vector=vector)
+
+    clock.now += 11
+    assert cache.get_similar("ns", vector, 0.5) is None
+
+
+@pytest.fixture
+def router(monkeypatch):
+    embedded = []
+
+    async def no_embedding(text):
+        embedded.append(text)
+        return None
+
+    monkeypatch.setattr(orchestrator, "_reply_cache", ResponseCache())
+    router = orchestrator.Orchestrator(genai.GenerativeModel("gemini-2.5-flash"))
+    monkeypatch.setattr(router.semantic_router, "embed", no_embedding)
+    router.embedded = embedded
+    return router
+
+
+def test_cached_chat_reply_is_not_shared_between_users(router):
+    context = ChatContext(user_level="Level 1", track="Data Analytics", task_id="t1")
+    lookup = router._cached_reply
+
+    async def scenario():
+        text, entry = await lookup(AgentName.EMEM, "When is this due?", context, (), "user-a")
+        assert text is None
+        orchestrator.Orchestrator._store_reply(entry, "Friday, 5 PM")
+
+        own, _ = await lookup(AgentName.EMEM, "when is  this due?", context, (), "user-a")
+        other, _ = await lookup(AgentName.EMEM, "When is this due?", context, (), "user-b")
+        return own, other
+
+    own, other = asyncio.run(scenario())
+
+    assert own == "Friday, 5 PM"
+    assert other is None
+
+
+def test_follow_ups_submissions_and_anonymous_requests_are_not_cached(router):
+    lookup = router._cached_reply
+    context = ChatContext(track="Data Analytics")
+    history = ({"role": "user", "content": "hi"},)
+
+    async def scenario():
+        return [
+            await lookup(AgentName.EMEM, "and then?", context, history, "user-a"),
+            await lookup(AgentName.SOLA, "here it is", ChatContext(is_submission=True), (), "user-a"),
+            await lookup(AgentName.EMEM, "When is this due?", context, (), None),
+            await lookup(AgentName.RECOMMENDER, "reference letter", context, (), "user-a"),
+        ]
+
+    assert asyncio.run(scenario()) == [(None, None)] * 4
+
+
+def test_routing_embedding_is_reused_for_the_similar_lookup(router):
+    context = ChatContext(track="Data Analytics", task_id="t1")
+    routed = [1.0, 0.0, 0.0, 0.0]
+
+    async def scenario():
+        _, entry = await router._cached_reply(AgentName.EMEM, "When is this due?", context, (), "user-a", routed)
+        orchestrator.Orchestrator._store_reply(entry, "Friday, 5 PM")
+        near = [0.99, 0.14, 0.0, 0.0]
+        return await router._cached_reply(AgentName.EMEM, "When's it due?", context, (), "user-a", near)
+
+    text, _ = asyncio.run(scenario())
+
+    assert text == "Friday, 5 PM"
+    assert router.embedded == []
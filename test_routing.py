@@ -0,0 +1,112 @@
+"""
+Tests for the routing steps that need no model call: hard rules, the
+keyword fast path, keyword scoring and the speculative guess.
+"""
+
+import asyncio
+
+import google.generativeai as genai
+import pytest
+
+from app.orchestrator import Orchestrator
+from app.schemas import AgentName, ChatContext
+
+
+@pytest.fixture(scope="module")
+def router():
+    return Orchestrator(genai.GenerativeModel("gemini-2.5-flash"))
+
+
+def test_submissions_always_go_to_sola(router):
+    context = ChatContext(is_submission=True, is_first_login=True)
+    assert router._rule_route("please write my reference letter", context) == AgentName.SOLA
+
+
+def test_first_login_goes_to_tolu(router):
+    assert router._rule_route("hello", ChatContext(is_first_login=True)) == AgentName.TOLU
+
+
+@pytest.mark.parametrize("msg", [
+    "can i get a recommendation letter",
+    "who should be my referee",
+    "i need the 12 weeks recommendation",
+])
+def test_letter_requests_go_to_recommender(router, msg):
+    assert router._rule_route(msg, ChatContext()) == AgentName.RECOMMENDER
+
+
+@pytest.mark.parametrize("msg, agent", [
+    ("my python script has a syntax error", AgentName.SOLA),
+    ("when is the deadline", AgentName.EMEM),
+    ("i'm anxious about my interview", AgentName.KEMI),
+    ("how do i request leave", AgentName.TOLU),
+])
+def test_fast_path_routes_single_agent_matches(router, msg, agent):
+    assert router._confident_keyword_route(msg) == agent
+
+
+@pytest.mark.parametrize("msg", [
+    # Two agents match
+    "the client found a bug",
+    # Whole words only: "encode" is not "code", "clientele" is not "client"
+    "how do i encode the clientele list",
+    # Long messages are left to the other routers
+    "python " + "word " * 30,
+])
+def test_fast_path_declines_ambiguous_or_long_messages(router, msg):
+    assert router._confident_keyword_route(msg) is None
+
+
+def test_keyword_scores_count_distinct_overlapping_hits(router):
+    scores = router._keyword_scores("debugging this error, error, error")
+
+    # "debug" and "bug" both hit inside "debugging"; repeated "error" counts once
+    assert scores[AgentName.SOLA] == 3
+    assert scores[AgentName.KEMI] == scores[AgentName.EMEM] == scores[AgentName.TOLU] == 0
+
+
+def test_fallback_routing_defaults_to_sola_without_hits(router):
+    assert router._fallback_routing(router._keyword_scores("hello there")) == AgentName.SOLA
+
+
+def test_speculative_guess_only_for_a_single_weak_lead(router):
+    def guess(msg):
+        return router._speculative_agent(router._keyword_scores(msg))
+
+    assert guess("i feel a bit lost") == AgentName.KEMI
+    # Ties and strong leads are settled without the LLM router, so no guess
+    assert guess("lost on this task") is None
+    assert guess("fix this python function") is None
+
+
+def test_keyword_route_needs_a_clear_winner(router):
+    assert router._keyword_route(router._keyword_scores("fix this python function")) == AgentName.SOLA
+    assert router._keyword_route(router._keyword_scores("lost on this task")) is None
+    assert router._keyword_route(router._keyword_scores("hello there")) is None
+
+
+def test_determine_agent_uses_rules_before_any_model_call(router):
+    agent = asyncio.run(router.determine_agent("My Python code has a syntax error", ChatContext()))
+    assert agent == AgentName.SOLA
+
+
+def test_route_without_llm_scores_once_and_skips_embedding_on_rule_hits(router, monkeypatch):
+    calls = []
+    score = router._keyword_scores
+
+    def counting_scores(msg):
+        calls.append(msg)
+        return score(msg)
+
+    async def no_embedding(text):
+        raise AssertionError("rule hits must not embed")
+
+    monkeypatch.setattr(router, "_keyword_scores", counting_scores)
+    monkeypatch.setattr(router.semantic_router, "embed", no_embedding)
+
+    agent, scores, vector = asyncio.run(router._route_without_llm("when is the deadline", ChatContext()))
+
+    assert agent == AgentName.EMEM
+    assert scores[AgentName.EMEM] > 0
+    assert vector is None
+    assert len(calls) == 1
@@ -0,0 +1,72 @@
+"""
+Tests for Sola's submission preview: short submissions are sent as-is,
+long ones are trimmed to the token budget with a single count_tokens call.
+"""
+
+import asyncio
+
+import pytest
+
+from app.agents import sola
+from app.agents.sola import (
+    CHARS_PER_TOKEN,
+    SUBMISSION_PREVIEW_CHARS,
+    SUBMISSION_PREVIEW_TOKENS,
+    _submission_preview,
+)
+
+
+@pytest.fixture
+def counted(monkeypatch):
+    """Fake count_tokens at a fixed number of characters per token; records every call."""
+    calls = []
+    state = {"chars_per_token": CHARS_PER_TOKEN}
+
+    async def fake_count_tokens(model, text):
+        calls.append(len(text))
+        return len(text) // state["chars_per_token"]
+
+    monkeypatch.setattr(sola, "count_tokens", fake_count_tokens)
+    return calls, state
+
+
+def _preview(text):
+    return asyncio.run(_submission_preview(text, model=None))
+
+
+def test_typical_length_submission_is_sent_whole_without_counting(counted):
+    calls, _ = counted
+    text = "x" * (SUBMISSION_PREVIEW_TOKENS * CHARS_PER_TOKEN)
+
+    assert _preview(text) == text
+    assert calls == []
+
+
+def test_token_dense_submission_is_trimmed_to_the_budget(counted):
+    calls, state = counted
+    state["chars_per_token"] = 2
+    text = "x" * (SUBMISSION_PREVIEW_CHARS * 3)
+
+    preview = _preview(text)
+
+    assert calls == [SUBMISSION_PREVIEW_CHARS]
+    assert len(preview) // 2 == SUBMISSION_PREVIEW_TOKENS
+
+
+def test_sparse_submission_within_budget_keeps_the_character_cut(counted):
+    calls, state = counted
+    state["chars_per_token"] = 10
+    text = "x" * (SUBMISSION_PREVIEW_CHARS * 3)
+
+    assert _preview(text) == text[:SUBMISSION_PREVIEW_CHARS]
+    assert len(calls) == 1
+
+
+def test_count_failure_falls_back_to_a_typical_length_cut(monkeypatch):
+    async def failing_count_tokens(model, text):
+        raise ConnectionError("gemini down")
+
+    monkeypatch.setattr(sola, "count_tokens", failing_count_tokens)
+    text = "x" * SUBMISSION_PREVIEW_CHARS
+
+    assert _preview(text) == text[:SUBMISSION_PREVIEW_TOKENS * CHARS_PER_TOKEN]
@@ -0,0 +1,145 @@
+"""
+Tests for the shared task cache in app.main: every intern gets their own
+name in a cached task, the cached copy is never modified, and concurrent
+identical requests share one generation.
+"""
+
+import asyncio
+
+import orjson
+import pytest
+
+from app import main, task_templates
+from app.main import _INTERN_NAME_PLACEHOLDER, TaskRequest
+
+
+def _cached_task():
+    return {
+        "title": "Sales cleanup",
+        "brief_content": f"Dear {_INTERN_NAME_PLACEHOLDER},\n\nClean the sales log.",
+        "metadata": {"notes": [f"Owner: {_INTERN_NAME_PLACEHOLDER}"], "task_number": 1},
+        "ai_persona_config": {"role": "Supervisor", "duration": "1 day"},
+        "deadline": None,
+        "deadline_display": None,
+    }
+
+
+def _request(user_name, **overrides):
+    fields = {
+        "user_id": f"id-{user_name}",
+        "user_name": user_name,
+        "track": "Data Analytics",
+        "experience_level": "Beginner",
+        "task_number": 1,
+        "include_ethical_trap": False,
+        "model": "gemini-2.5-flash",
+        "include_video_brief": False,
+    }
+    fields.update(overrides)
+    return TaskRequest(**fields)
+
+
+@pytest.fixture(autouse=True)
+def empty_task_cache():
+    main._TASK_CACHE.clear()
+    main._TASK_INFLIGHT.clear()
+    yield
+    main._TASK_CACHE.clear()
+    main._TASK_INFLIGHT.clear()
+
+
+def test_personalize_replaces_nested_placeholders_without_touching_the_original():
+    cached = _cached_task()
+
+    task = main._personalize(cached, "Ada")
+
+    assert task["brief_content"].startswith("Dear Ada,")
+    assert task["metadata"]["notes"] == ["Owner: Ada"]
+    assert cached == _cached_task()
+
+
+def test_interns_sharing_a_cached_task_each_get_their_own_name():
+    req = _request("Ada")
+    key = (req.track_key, "beginner", 1, None, False, False)
+    main._TASK_CACHE[key] = _cached_task()
+
+    async def scenario():
+        first = await main.generate_tasks(req)
+        second = await main.generate_tasks(_request("Bola"))
+        return first["tasks"][0], second["tasks"][0]
+
+    first, second = asyncio.run(scenario())
+
+    assert first["brief_content"].startswith("Dear Ada,")
+    assert second["brief_content"].startswith("Dear Bola,")
+    assert first["deadline"] and first["deadline_display"]
+    assert main._TASK_CACHE[key] == _cached_task()
+
+
+def test_concurrent_identical_requests_share_one_generation(monkeypatch):
+    calls = []
+
+    async def fake_generate_task(**kwargs):
+        calls.append(kwargs)
+        await asyncio.sleep(0.01)
+        return _cached_task()
+
+    monkeypatch.setattr(main, "generate_task", fake_generate_task)
+
+    async def scenario():
+        return await asyncio.gather(
+            main.generate_tasks(_request("Ada")),
+            main.generate_tasks(_request("Bola")),
+        )
+
+    first, second = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert calls[0]["user_name"] == _INTERN_NAME_PLACEHOLDER
+    assert first["tasks"][0]["brief_content"].startswith("Dear Ada,")
+    assert second["tasks"][0]["brief_content"].startswith("Dear Bola,")
+    assert len(main._TASK_CACHE) == 1
+
+
+def test_failed_generation_is_not_cached(monkeypatch):
+    async def failing_generate_task(**kwargs):
+        raise RuntimeError("gemini down")
+
+    monkeypatch.setattr(main, "generate_task", failing_generate_task)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main.generate_tasks(_request("Ada")))
+
+    assert len(main._TASK_CACHE) == 0
+    assert not main._TASK_INFLIGHT
+
+
+class RecordingModel:
+    """Answers every prompt with a fixed brief and records what it was sent."""
+
+    model_name = "models/recording"
+
+    def __init__(self):
+        self.prompts = []
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        brief = {"title": "Sales cleanup", "brief_template": "Clean the sales log.", "constraints": "None"}
+        return type("Response", (), {"text": orjson.dumps(brief).decode()})()
+
+
+def test_intern_name_never_reaches_the_model_and_greeting_is_added_after():
+    model = RecordingModel()
+
+    task = asyncio.run(task_templates.generate_task(
+        user_name=_INTERN_NAME_PLACEHOLDER,
+        track="Data Analytics",
+        task_number=1,
+        include_ethical_trap=False,
+        model=model,
+        include_video_brief=True
+    ))
+
+    assert model.prompts
+    assert all(_INTERN_NAME_PLACEHOLDER not in prompt for prompt in model.prompts)
+    assert task["brief_content"] == f"Dear {_INTERN_NAME_PLACEHOLDER},\n\nClean the sales log."